@@ -6,6 +6,9 @@ from lib import (
     QConfig,
     ConfigItem,
     BoolValidator,
+    FolderListValidator,
+    RangeValidator,
+    RangeConfigItem,
     OptionsValidator,
     OptionsConfigItem,
 )
@@ -37,6 +40,30 @@ class Config(QConfig):
         restart=True,
     )
 
+    # render
+    pageCacheSize = RangeConfigItem(
+        "Render", "PageCacheSize", 512, RangeValidator(64, 4096)
+    )
+    diskCacheSize = RangeConfigItem(
+        "Render", "DiskCacheSize", 1024, RangeValidator(128, 16384)
+    )
+    textPageCacheSize = RangeConfigItem(
+        "Render", "TextPageCacheSize", 64, RangeValidator(16, 1024)
+    )
+
+    # text view
+    showHtmlImages = ConfigItem(
+        "TextView", "ShowHtmlImages", True, BoolValidator()
+    )
+
+    # library
+    libraryIndexEnabled = ConfigItem(
+        "Library", "IndexEnabled", False, BoolValidator()
+    )
+    libraryFolders = ConfigItem(
+        "Library", "Folders", [], FolderListValidator()
+    )
+
     # software update
     checkUpdateAtStartUp = ConfigItem(
         "Update", "CheckUpdateAtStartUp", True, BoolValidator()
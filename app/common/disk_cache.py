@@ -0,0 +1,64 @@
+# coding: utf-8
+import hashlib
+
+from PyQt5.QtCore import QObject, QTimer
+
+from .config import cfg
+from .page_cache import PageCacheKey
+from .render_service import renderService
+from .setting import CACHE_FOLDER
+from ..utils.file_utils import trim_folder
+
+
+class DiskCache(QObject):
+    """Rendered page image cache persisted across sessions, with a size cap"""
+
+    def __init__(self, folder, max_bytes: int, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.max_bytes = max_bytes
+        # the trim running in a reader thread, another one waits for it to finish
+        self.trim_future = None
+
+        # started by the first write after a trim and never restarted, so the cache is
+        # trimmed every 10 s while pages are rendered
+        self.trim_timer = QTimer(self)
+        self.trim_timer.setSingleShot(True)
+        self.trim_timer.setInterval(10000)
+        self.trim_timer.timeout.connect(self.trim)
+
+        # restarted by every change of the size cap, so dragging its slider trims once
+        self.max_bytes_timer = QTimer(self)
+        self.max_bytes_timer.setSingleShot(True)
+        self.max_bytes_timer.setInterval(500)
+        self.max_bytes_timer.timeout.connect(self.trim)
+
+    def get_file_path(self, key: PageCacheKey) -> str:
+        """Get the image file of `key`, workers rendering `key` write their result to it."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        if not self.trim_timer.isActive():
+            self.trim_timer.start()
+        name = hashlib.blake2b(repr(tuple(key)).encode(), digest_size=16)
+        return str(self.folder / f"{name.hexdigest()}.page")
+
+    def set_max_bytes(self, max_bytes: int):
+        """set the size cap of the cache"""
+        self.max_bytes = max_bytes
+        self.max_bytes_timer.start()
+
+    def trim(self):
+        """delete the least recently used image files until the cache fits its size cap"""
+        if self.trim_future is not None and not self.trim_future.done():
+            self.max_bytes_timer.start()
+            return
+
+        # the folder is scanned in a reader thread, keeping the stat of every file off
+        # the GUI thread
+        self.trim_future = renderService.reader.submit(
+            trim_folder, str(self.folder), self.max_bytes
+        )
+
+
+diskCache = DiskCache(
+    CACHE_FOLDER / "pages", cfg.get(cfg.diskCacheSize) * 1024 * 1024
+)
@@ -0,0 +1,221 @@
+# coding: utf-8
+import sqlite3
+import unicodedata
+
+from typing import List, NamedTuple, Tuple
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from .config import cfg
+from .setting import LIBRARY_INDEX_FILE, SUPPORT_TEXT_FORMAT
+from .render_service import renderService, LibraryJob, ScanJob
+from ..utils.text_utils import TERM_PATTERN
+
+# pages are stored with a rowid of `document id << PAGE_BITS | page index`, so the pages
+# of a document are a rowid range that is deleted without scanning the text table
+PAGE_BITS = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    page_count INTEGER NOT NULL DEFAULT -1,
+    indexed_page_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+    text, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+class LibraryHit(NamedTuple):
+    """Match of a query on a page of a library document"""
+
+    path: str
+    page_index: int
+    snippet: str
+
+
+class LibraryIndex(QObject):
+    """Full-text index of the documents in the library folders, kept in SQLite FTS5"""
+
+    # indexed document count and document count
+    progress_changed = pyqtSignal(int, int)
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.connection = None
+        self.BATCH_SIZE = 20
+        # documents left to index as (id, path, page count, indexed page count)
+        self.pending_list: List[Tuple[int, str, int, int]] = []
+        self.document_count = 0
+        self.job = None
+        self.scan_job = None
+
+        renderService.library_text_extracted.connect(self.on_text_extracted)
+        renderService.folders_scanned.connect(self.on_folders_scanned)
+        cfg.libraryIndexEnabled.valueChanged.connect(lambda _: self.update())
+        cfg.libraryFolders.valueChanged.connect(lambda _: self.update())
+
+    def connect(self) -> sqlite3.Connection:
+        """open the database, creating its tables on first use"""
+        if self.connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.connection = sqlite3.connect(str(self.path))
+            self.connection.executescript(SCHEMA)
+        return self.connection
+
+    def update(self):
+        """
+        Bring the index up to date with the library folders in the background.
+
+        Documents whose size and modification time are unchanged keep their pages,
+        changed documents are indexed again, removed ones are dropped, and documents
+        whose indexing was interrupted continue from their last indexed page. The
+        folders are walked in a worker process.
+        """
+        self.pending_list = []
+        self.job = None
+        if self.scan_job is not None:
+            renderService.cancel(self.scan_job)
+            self.scan_job = None
+        if not cfg.get(cfg.libraryIndexEnabled):
+            self.progress_changed.emit(0, 0)
+            return
+
+        self.scan_job = ScanJob(
+            self, cfg.get(cfg.libraryFolders), SUPPORT_TEXT_FORMAT
+        )
+        renderService.scan_folders(self.scan_job)
+
+    def on_folders_scanned(self, job):
+        """sync the documents with the scanned files and index the changed ones"""
+        if job is not self.scan_job:
+            return
+
+        self.scan_job = None
+        if job.file_dict is None:
+            return
+
+        file_dict = job.file_dict
+        connection = self.connect()
+        with connection:
+            for id, path, size, mtime in connection.execute(
+                "SELECT id, path, size, mtime FROM documents"
+            ).fetchall():
+                stat = file_dict.pop(path, None)
+                if stat == (size, mtime):
+                    continue
+
+                self.delete_pages(id)
+                if stat is None:
+                    connection.execute("DELETE FROM documents WHERE id = ?", (id,))
+                else:
+                    connection.execute(
+                        "UPDATE documents SET size = ?, mtime = ?, page_count = -1, "
+                        "indexed_page_count = 0 WHERE id = ?",
+                        (*stat, id),
+                    )
+
+            connection.executemany(
+                "INSERT INTO documents (path, size, mtime) VALUES (?, ?, ?)",
+                [(path, *stat) for path, stat in file_dict.items()],
+            )
+
+        self.document_count = connection.execute(
+            "SELECT COUNT(*) FROM documents"
+        ).fetchone()[0]
+        self.pending_list = connection.execute(
+            "SELECT id, path, page_count, indexed_page_count FROM documents "
+            "WHERE page_count < 0 OR indexed_page_count < page_count ORDER BY path"
+        ).fetchall()
+        self.emit_progress()
+        self.index_next_batch()
+
+    def delete_pages(self, document_id: int):
+        """delete the indexed pages of a document"""
+        self.connection.execute(
+            "DELETE FROM pages WHERE rowid >= ? AND rowid < ?",
+            (document_id << PAGE_BITS, (document_id + 1) << PAGE_BITS),
+        )
+
+    def index_next_batch(self):
+        """Extract the text of the next pages of the first pending document in a worker."""
+        if self.job is not None or not self.pending_list:
+            return
+
+        _, path, _, indexed_page_count = self.pending_list[0]
+        self.job = LibraryJob(
+            self, path, indexed_page_count, indexed_page_count + self.BATCH_SIZE
+        )
+        renderService.extract_library_text(self.job)
+
+    def on_text_extracted(self, job):
+        """on text extracted"""
+        if job is not self.job:
+            return
+
+        self.job = None
+        id, path, _, start = self.pending_list[0]
+        # documents that can not be opened count as empty until they change
+        page_count = job.page_count or 0
+        page_count = min(page_count, 1 << PAGE_BITS)
+        end = min(start + len(job.text_list), page_count)
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO pages (rowid, text) VALUES (?, ?)",
+                [
+                    ((id << PAGE_BITS) + i, text)
+                    for i, text in zip(range(start, end), job.text_list)
+                    if text.strip()
+                ],
+            )
+            self.connection.execute(
+                "UPDATE documents SET page_count = ?, indexed_page_count = ? "
+                "WHERE id = ?",
+                (page_count, end, id),
+            )
+
+        if end < page_count:
+            self.pending_list[0] = (id, path, page_count, end)
+        else:
+            self.pending_list.pop(0)
+            self.emit_progress()
+        self.index_next_batch()
+
+    def emit_progress(self):
+        """emit the indexing progress"""
+        self.progress_changed.emit(
+            self.document_count - len(self.pending_list), self.document_count
+        )
+
+    def search(self, query: str, limit: int = 100) -> List[LibraryHit]:
+        """
+        Find the pages of the library matching every term of a query, best first.
+
+        Terms are matched as prefixes. Like the indexed text, they are only normalized by
+        compatibility and left for the FTS5 tokenizer to fold, as its case and accent
+        folding differs from `fold_text` for characters such as "ß".
+        """
+        term_list = TERM_PATTERN.findall(unicodedata.normalize("NFKC", query))
+        if not term_list or not cfg.get(cfg.libraryIndexEnabled):
+            return []
+
+        match = " ".join(f'"{term}"*' for term in term_list)
+        row_list = self.connect().execute(
+            "SELECT documents.path, pages.rowid, "
+            "snippet(pages, 0, '', '', '…', 12) FROM pages "
+            "JOIN documents ON documents.id = pages.rowid >> ? "
+            "WHERE pages MATCH ? ORDER BY rank LIMIT ?",
+            (PAGE_BITS, match, limit),
+        ).fetchall()
+        return [
+            LibraryHit(path, rowid & ((1 << PAGE_BITS) - 1), " ".join(snippet.split()))
+            for path, rowid, snippet in row_list
+        ]
+
+
+libraryIndex = LibraryIndex(LIBRARY_INDEX_FILE)
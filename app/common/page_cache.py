@@ -0,0 +1,86 @@
+# coding: utf-8
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from PyQt5.QtGui import QPixmap
+
+from .config import cfg
+
+
+class PageCacheKey(NamedTuple):
+    """Key of a rendered page image"""
+
+    document: str
+    page_index: int
+    zoom: float
+    rotation: int
+    device_pixel_ratio: float
+    tile: Optional[Tuple[float, float, float, float]] = None
+
+
+class PageCache:
+    """Rendered page image cache with a byte budget and least recently used eviction"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pixmap_dict = OrderedDict()
+
+    def get(self, key: PageCacheKey) -> Optional[QPixmap]:
+        """Get the cached image of `key` and mark it as recently used."""
+        pixmap = self.pixmap_dict.get(key)
+        if pixmap is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.pixmap_dict.move_to_end(key)
+        return pixmap
+
+    def put(self, key: PageCacheKey, pixmap: QPixmap):
+        """Cache the image of `key`, evicting the least recently used images when over budget."""
+        size = self.get_pixmap_size(pixmap)
+        if size > self.max_bytes:
+            return
+
+        old_pixmap = self.pixmap_dict.pop(key, None)
+        if old_pixmap is not None:
+            self.used_bytes -= self.get_pixmap_size(old_pixmap)
+
+        self.pixmap_dict[key] = pixmap
+        self.used_bytes += size
+        self.evict()
+
+    def set_max_bytes(self, max_bytes: int):
+        """set the byte budget of the cache"""
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def evict(self):
+        """evict the least recently used images until the cache fits its budget"""
+        while self.used_bytes > self.max_bytes:
+            _, pixmap = self.pixmap_dict.popitem(last=False)
+            self.used_bytes -= self.get_pixmap_size(pixmap)
+            self.evictions += 1
+
+    def statistics(self) -> Dict[str, int]:
+        """get the usage statistics of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.pixmap_dict),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    @staticmethod
+    def get_pixmap_size(pixmap: QPixmap) -> int:
+        """get the number of bytes held by a pixmap"""
+        return pixmap.width() * pixmap.height() * pixmap.depth() // 8
+
+
+pageCache = PageCache(cfg.get(cfg.pageCacheSize) * 1024 * 1024)
@@ -0,0 +1,600 @@
+# coding: utf-8
+import os
+
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PyQt5.QtCore import QObject, pyqtSignal
+from PyQt5.QtGui import QImage
+
+from ..utils.file_utils import scan_folders
+from ..utils.render_utils import render_page_image, samples_to_image, read_image_file
+from ..utils.text_utils import (
+    get_page_content_flags,
+    extract_page_content,
+    extract_library_text,
+    index_page_words,
+    search_page_text,
+)
+
+
+class RenderJob:
+    """Render job"""
+
+    def __init__(
+        self,
+        owner,
+        path,
+        password,
+        page_index,
+        zoom,
+        tile=None,
+        cache_path=None,
+        generation=0,
+        draft=False,
+        device_pixel_ratio=1.0,
+    ):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the rendered image is delivered to
+
+        path: str
+            path of the document
+
+        password: str | None
+            password the document was authenticated with
+
+        page_index: int
+            zero-based index of the page
+
+        zoom: float
+            scale factor, 1.0 renders at 72 dpi
+
+        tile: QRectF | None
+            region of the page in pixels at `zoom` to render, the whole page if None
+
+        cache_path: str | None
+            disk cache file the image is read from, or else the worker also writes the
+            rendered image to
+
+        generation: int
+            view state of the owner the job was queued for, results of an older
+            generation are outdated
+
+        draft: bool
+            whether to render a quick, coarse image to be replaced once the view is idle
+
+        device_pixel_ratio: float
+            device pixel ratio of the screen, the image has `zoom` times as many
+            device pixels per point and is tagged with it
+        """
+        self.owner = owner
+        self.path = path
+        self.password = password
+        self.page_index = page_index
+        self.zoom = zoom
+        self.tile = tile
+        self.cache_path = cache_path
+        self.generation = generation
+        self.draft = draft
+        self.device_pixel_ratio = device_pixel_ratio
+        self.image = QImage()
+        self.future = None
+        self.cancelled = False
+
+
+class TextJob:
+    """Text extraction job, telling the text view which pages have content"""
+
+    def __init__(self, owner, path, password, start, end):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the page flags are delivered to
+
+        path: str
+            path of the document
+
+        password: str | None
+            password the document was authenticated with
+
+        start: int
+            zero-based index of the first page
+
+        end: int
+            index after the last page
+        """
+        self.owner = owner
+        self.path = path
+        self.password = password
+        self.start = start
+        self.end = end
+        # whether each page may hold text and whether it has images
+        self.flag_list = []
+        self.future = None
+
+
+class ContentJob:
+    """Text view content job, extracting the text or html of the pages it shows"""
+
+    def __init__(self, owner, path, password, page_list, is_html, show_images):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the content is delivered to
+
+        path: str
+            path of the document
+
+        password: str | None
+            password the document was authenticated with
+
+        page_list: list[int]
+            zero-based indexes of the pages to extract
+
+        is_html: bool
+            whether to extract the html of the pages instead of their plain text
+
+        show_images: bool
+            whether the html references the images of the pages
+        """
+        self.owner = owner
+        self.path = path
+        self.password = password
+        self.page_list = page_list
+        self.is_html = is_html
+        self.show_images = show_images
+        self.content_list = None
+        self.future = None
+
+
+class IndexJob:
+    """Search index job"""
+
+    def __init__(self, owner, path, password, start, end):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the postings are delivered to
+
+        path: str
+            path of the document
+
+        password: str | None
+            password the document was authenticated with
+
+        start: int
+            zero-based index of the first page
+
+        end: int
+            index after the last page
+        """
+        self.owner = owner
+        self.path = path
+        self.password = password
+        self.start = start
+        self.end = end
+        self.posting_dict = None
+        self.trigram_dict = None
+        self.text_list = None
+        self.future = None
+
+
+class SearchJob:
+    """Text search job"""
+
+    def __init__(self, owner, page_list, text_list, pattern, max_hits):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the hits are delivered to
+
+        page_list: list[int]
+            zero-based indexes of the pages to search, in order
+
+        text_list: list[str]
+            text of each page, as extracted by the search index job
+
+        pattern: str
+            case-insensitive regular expression to match
+
+        max_hits: int
+            number of matches to stop at
+        """
+        self.owner = owner
+        self.page_list = page_list
+        self.text_list = text_list
+        self.pattern = pattern
+        self.max_hits = max_hits
+        self.hit_list = None
+        self.future = None
+
+
+class LibraryJob:
+    """Library index job"""
+
+    def __init__(self, owner, path, start, end):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the extracted text is delivered to
+
+        path: str
+            path of the document
+
+        start: int
+            zero-based index of the first page
+
+        end: int
+            index after the last page, clamped to the page count
+        """
+        self.owner = owner
+        self.path = path
+        self.start = start
+        self.end = end
+        self.page_count = None
+        self.text_list = []
+        self.future = None
+
+
+class ScanJob:
+    """Library folder scan job"""
+
+    def __init__(self, owner, folder_list, suffix_tuple):
+        """
+        Parameters
+        ----------
+        owner: QObject
+            the object the scanned files are delivered to
+
+        folder_list: list[str]
+            folders to walk, including their subfolders
+
+        suffix_tuple: tuple[str]
+            lowercase suffixes of the files to collect
+        """
+        self.owner = owner
+        self.folder_list = folder_list
+        self.suffix_tuple = suffix_tuple
+        self.file_dict = None
+        self.future = None
+
+
+class RenderService(QObject):
+    """Render service rasterizing pages and extracting their text in worker processes"""
+
+    page_rendered = pyqtSignal(object)
+    text_extracted = pyqtSignal(object)
+    content_extracted = pyqtSignal(object)
+    words_indexed = pyqtSignal(object)
+    library_text_extracted = pyqtSignal(object)
+    text_searched = pyqtSignal(object)
+    folders_scanned = pyqtSignal(object)
+    # (job, done callback, function, arguments) of a job lost with a dead worker
+    job_broken = pyqtSignal(object)
+    # lost job run alone, whose future is done
+    suspect_finished = pyqtSignal(object)
+    # render job whose disk cache file is missing
+    cache_missed = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.max_workers = max(1, min((os.cpu_count() or 2) - 1, 4))
+        self.executor = None
+        # jobs lost with a dead worker, run one at a time in a worker of their own, as
+        # any of them may be the one that killed it
+        self.suspect_executor = None
+        self.suspect_list = []
+        # disk cache files are read in threads, keeping the copy of their pixels off
+        # the GUI thread without waiting behind the jobs of the workers
+        self.reader = ThreadPoolExecutor(2)
+        # queued, so jobs lost by the executor thread are submitted again from the
+        # thread of the service
+        self.job_broken.connect(self.resubmit)
+        self.suspect_finished.connect(self.on_suspect_finished)
+        self.cache_missed.connect(self.render_in_worker)
+
+    def start(self):
+        """start worker processes"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=get_context("spawn")
+            )
+            # workers are spawned on the first submission, so warm them up right away
+            self.executor.submit(os.getpid)
+
+    def restart(self):
+        """replace the worker processes after one of them died"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = None
+        self.start()
+
+    def submit(self, job, on_done, fn, *args):
+        """
+        Run `fn` in a worker process for `job` and call `on_done` once it is done.
+
+        A worker that dies, for instance on a page crashing mupdf, breaks the whole pool
+        and fails every job it held. The pool is replaced, and the lost jobs are run
+        again one at a time in a worker of their own, so only the job that kills that
+        worker too fails.
+        """
+        self.start()
+        try:
+            job.future = self.executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.restart()
+            job.future = self.executor.submit(fn, *args)
+
+        def on_future_done(future):
+            if not future.cancelled() and isinstance(
+                future.exception(), BrokenProcessPool
+            ):
+                self.job_broken.emit((job, on_done, fn, args))
+            else:
+                on_done(job)
+
+        job.future.add_done_callback(on_future_done)
+
+    def resubmit(self, item):
+        """queue a job lost with a dead worker to run alone"""
+        job = item[0]
+        if isinstance(job, RenderJob) and job.cancelled:
+            return
+
+        self.suspect_list.append(item)
+        if len(self.suspect_list) == 1:
+            self.submit_suspect()
+
+    def submit_suspect(self):
+        """run the first lost job in the worker of the lost jobs"""
+        if self.suspect_executor is None:
+            self.suspect_executor = ProcessPoolExecutor(
+                1, mp_context=get_context("spawn")
+            )
+
+        job, on_done, fn, args = self.suspect_list[0]
+        job.future = self.suspect_executor.submit(fn, *args)
+
+        def on_future_done(future):
+            on_done(job)
+            self.suspect_finished.emit(job)
+
+        job.future.add_done_callback(on_future_done)
+
+    def on_suspect_finished(self, job):
+        """run the next lost job, in a new worker if this one killed it"""
+        if not self.suspect_list or self.suspect_list[0][0] is not job:
+            # the service was shut down
+            return
+
+        if not job.future.cancelled() and isinstance(
+            job.future.exception(), BrokenProcessPool
+        ):
+            self.suspect_executor.shutdown(wait=False)
+            self.suspect_executor = None
+
+        self.suspect_list.pop(0)
+        if self.suspect_list:
+            self.submit_suspect()
+
+    def render(self, job: RenderJob):
+        """
+        Queue a render job, `page_rendered` is emitted once it is done.
+
+        A job with a disk cache file reads it in a reader thread first and is only
+        rendered by a worker if the file is missing.
+        """
+        if job.cache_path is None:
+            self.render_in_worker(job)
+            return
+
+        job.future = self.reader.submit(read_image_file, job.cache_path)
+        job.future.add_done_callback(lambda _: self.on_cache_read(job))
+
+    def render_in_worker(self, job: RenderJob):
+        """render the page of a job in a worker process"""
+        if job.cancelled:
+            return
+
+        clip = None
+        if job.tile is not None:
+            clip = tuple(
+                value / job.zoom for value in job.tile.getCoords()
+            )
+
+        self.submit(
+            job,
+            self.on_job_done,
+            render_page_image,
+            job.path,
+            job.password,
+            job.page_index,
+            job.zoom * job.device_pixel_ratio,
+            clip,
+            job.cache_path,
+            job.draft,
+        )
+
+    def extract_text(self, job: TextJob):
+        """Queue a text extraction job, `text_extracted` is emitted once it is done."""
+        self.submit(
+            job,
+            self.on_text_job_done,
+            get_page_content_flags,
+            job.path,
+            job.password,
+            job.start,
+            job.end,
+        )
+
+    def extract_content(self, job: ContentJob):
+        """Queue a text view content job, `content_extracted` is emitted once it is done."""
+        self.submit(
+            job,
+            self.on_content_job_done,
+            extract_page_content,
+            job.path,
+            job.password,
+            job.page_list,
+            job.is_html,
+            job.show_images,
+        )
+
+    def index_words(self, job: IndexJob):
+        """Queue a search index job, `words_indexed` is emitted once it is done."""
+        self.submit(
+            job,
+            self.on_index_job_done,
+            index_page_words,
+            job.path,
+            job.password,
+            job.start,
+            job.end,
+        )
+
+    def search_text(self, job: SearchJob):
+        """Queue a text search job, `text_searched` is emitted once it is done."""
+        self.submit(
+            job,
+            self.on_search_job_done,
+            search_page_text,
+            job.page_list,
+            job.text_list,
+            job.pattern,
+            job.max_hits,
+        )
+
+    def extract_library_text(self, job: LibraryJob):
+        """Queue a library index job, `library_text_extracted` is emitted once it is done."""
+        self.submit(
+            job,
+            self.on_library_job_done,
+            extract_library_text,
+            job.path,
+            job.start,
+            job.end,
+        )
+
+    def scan_folders(self, job: ScanJob):
+        """Queue a library folder scan, `folders_scanned` is emitted once it is done."""
+        self.submit(
+            job, self.on_scan_job_done, scan_folders, job.folder_list, job.suffix_tuple
+        )
+
+    def cancel(self, job: RenderJob):
+        """Cancel a render job, unless a worker has already picked it up."""
+        if job.future is not None:
+            job.future.cancel()
+        if isinstance(job, RenderJob):
+            # a job whose disk cache file is missing is handed to a worker after the read
+            job.cancelled = True
+
+    def on_cache_read(self, job: RenderJob):
+        """on cache read, called from the reader thread"""
+        if job.future.cancelled():
+            return
+
+        image = job.future.result()
+        if image is None:
+            self.cache_missed.emit(job)
+            return
+
+        # mark the file as recently used
+        try:
+            os.utime(job.cache_path)
+        except OSError:
+            pass
+        job.image = image
+        job.image.setDevicePixelRatio(job.device_pixel_ratio)
+        self.page_rendered.emit(job)
+
+    def on_job_done(self, job: RenderJob):
+        """on job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            *image, samples = job.future.result()
+            if samples is None:
+                # the worker handed the image over through its disk cache file
+                job.image = read_image_file(job.cache_path) or QImage()
+            else:
+                # detach from `samples`, so pixmaps can share the pixels without a copy
+                job.image = samples_to_image(*image, samples).copy()
+            job.image.setDevicePixelRatio(job.device_pixel_ratio)
+        self.page_rendered.emit(job)
+
+    def on_text_job_done(self, job: TextJob):
+        """on text job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.flag_list = job.future.result()
+        self.text_extracted.emit(job)
+
+    def on_content_job_done(self, job: ContentJob):
+        """on content job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.content_list = job.future.result()
+        self.content_extracted.emit(job)
+
+    def on_index_job_done(self, job: IndexJob):
+        """on index job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.posting_dict, job.trigram_dict, job.text_list = job.future.result()
+        self.words_indexed.emit(job)
+
+    def on_search_job_done(self, job: SearchJob):
+        """on search job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.hit_list = job.future.result()
+        self.text_searched.emit(job)
+
+    def on_library_job_done(self, job: LibraryJob):
+        """on library job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.page_count, job.text_list = job.future.result()
+        self.library_text_extracted.emit(job)
+
+    def on_scan_job_done(self, job: ScanJob):
+        """on scan job done, called from the executor thread"""
+        if job.future.cancelled():
+            return
+
+        if job.future.exception() is None:
+            job.file_dict = job.future.result()
+        self.folders_scanned.emit(job)
+
+    def shutdown(self):
+        """stop worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.suspect_executor is not None:
+            self.suspect_executor.shutdown(wait=False, cancel_futures=True)
+            self.suspect_executor = None
+            self.suspect_list = []
+
+
+renderService = RenderService()
@@ -0,0 +1,142 @@
+# coding: utf-8
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..utils.text_utils import get_terms, get_trigrams
+
+
+class SearchHit(NamedTuple):
+    """Match of a query on a page"""
+
+    page_index: int
+    # positions of the words holding the first and the last term of the query
+    first_word: int
+    last_word: int
+
+
+class TextHit(NamedTuple):
+    """Match of a substring or regular expression on a page"""
+
+    page_index: int
+    text: str
+    # number of earlier matches of the same text on the page
+    occurrence: int
+    snippet: str
+
+
+class SearchIndex:
+    """Inverted index of the folded terms of a document, filled batch by batch"""
+
+    def __init__(self):
+        # term -> (page index, word position) in page order
+        self.posting_dict: Dict[str, List[Tuple[int, int]]] = {}
+        # sorted terms, the terms starting with a prefix are a contiguous run
+        self.term_list: List[str] = []
+        # terms added since the last search, merged into `term_list` in one sort when
+        # the next search needs it rather than inserted one by one
+        self.new_term_list: List[str] = []
+        # trigram of the folded text -> bit mask of the pages holding it
+        self.trigram_dict: Dict[str, int] = {}
+        # pages at and after it are not indexed yet, so any of them may match
+        self.indexed_page_count = 0
+        # text of the indexed pages, searched for substrings and regular expressions
+        # instead of parsing the pages again, None for the pages that failed to index
+        self.text_list: List[Optional[str]] = []
+
+    def __len__(self):
+        return len(self.posting_dict)
+
+    def add_postings(self, posting_dict: Dict[str, List[Tuple[int, int]]]):
+        """add the postings of pages following the indexed ones"""
+        for term, posting_list in posting_dict.items():
+            if term in self.posting_dict:
+                self.posting_dict[term] += posting_list
+            else:
+                self.posting_dict[term] = list(posting_list)
+                self.new_term_list.append(term)
+
+    def add_texts(self, text_list: List[Optional[str]]):
+        """add the text of pages following the indexed ones"""
+        self.text_list += text_list
+
+    def sort_terms(self):
+        """merge the terms added since the last search into the sorted terms"""
+        if self.new_term_list:
+            # the sort finds the two sorted runs and merges them
+            self.new_term_list.sort()
+            self.term_list += self.new_term_list
+            self.term_list.sort()
+            self.new_term_list = []
+
+    def add_trigrams(self, trigram_dict: Dict[str, int], start: int, end: int):
+        """add the trigram masks of the pages from `start` to `end`, bit 0 being `start`"""
+        for trigram, mask in trigram_dict.items():
+            self.trigram_dict[trigram] = self.trigram_dict.get(trigram, 0) | (
+                mask << start
+            )
+        self.indexed_page_count = end
+
+    def get_candidate_pages(self, literal_list: List[str], page_count: int) -> List[int]:
+        """
+        Get the pages that may contain every literal, in order.
+
+        An indexed page is skipped as soon as it lacks one trigram of the literals,
+        literals shorter than a trigram filter nothing.
+        """
+        mask = (1 << self.indexed_page_count) - 1
+        for literal in literal_list:
+            for trigram in get_trigrams(literal):
+                mask &= self.trigram_dict.get(trigram, 0)
+
+        page_list = []
+        while mask:
+            low_bit = mask & -mask
+            page_list.append(low_bit.bit_length() - 1)
+            mask ^= low_bit
+        return page_list + list(range(self.indexed_page_count, page_count))
+
+    def get_prefix_postings(self, prefix: str) -> Dict[int, List[int]]:
+        """Get the sorted word positions of the terms starting with `prefix`, by page."""
+        self.sort_terms()
+        position_dict = {}
+        i = bisect_left(self.term_list, prefix)
+        while i < len(self.term_list) and self.term_list[i].startswith(prefix):
+            for page_index, position in self.posting_dict[self.term_list[i]]:
+                position_dict.setdefault(page_index, []).append(position)
+            i += 1
+
+        for position_list in position_dict.values():
+            position_list.sort()
+        return position_dict
+
+    def search(self, query: str) -> List[SearchHit]:
+        """
+        Find the matches of a query in page order.
+
+        Every term of the query is a prefix, so results show up while a word is typed.
+        The terms have to follow each other, each in the same word as the previous
+        one or in the next word, so "err 24" matches "ERR-2498" and "café hello"
+        matches "Café, hello".
+        """
+        term_list = get_terms(query)
+        if not term_list:
+            return []
+
+        position_dict_list = [self.get_prefix_postings(term) for term in term_list]
+        page_set = set(position_dict_list[0])
+        for position_dict in position_dict_list[1:]:
+            page_set &= position_dict.keys()
+
+        hit_list = []
+        for page_index in sorted(page_set):
+            for first_word in position_dict_list[0][page_index]:
+                last_word = first_word
+                for position_dict in position_dict_list[1:]:
+                    position_list = position_dict[page_index]
+                    i = bisect_left(position_list, last_word)
+                    if i == len(position_list) or position_list[i] > last_word + 1:
+                        break
+                    last_word = position_list[i]
+                else:
+                    hit_list.append(SearchHit(page_index, first_word, last_word))
+        return hit_list
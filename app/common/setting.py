@@ -16,6 +16,8 @@ CONFIG_FOLDER = (
     / APP_NAME
 )
 CONFIG_FILE = CONFIG_FOLDER / "config.json"
+CACHE_FOLDER = CONFIG_FOLDER / "cache"
+LIBRARY_INDEX_FILE = CONFIG_FOLDER / "library.db"
 
 # about files
 SUPPORT_IMG_FORMAT = (".png", ".jpg", ".jpeg", ".bmp", ".tiff", ".svg")
@@ -28,3 +30,5 @@ SUPPORT_FORMAT = (
     ".fb2",
     ".cbz",
 ) + SUPPORT_IMG_FORMAT
+# formats holding text, the documents of the library index
+SUPPORT_TEXT_FORMAT = (".pdf", ".epub", ".txt", ".mobi", ".xps", ".fb2")
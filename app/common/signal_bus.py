@@ -6,6 +6,8 @@ class SignalBus(QObject):
     """Signal bus"""
 
     micaEnableChanged = pyqtSignal(bool)
+    # path of a document and the page count to show
+    documentOpenRequested = pyqtSignal(str, int)
 
 
 signalBus = SignalBus()
@@ -0,0 +1,72 @@
+# coding: utf-8
+from collections import OrderedDict
+from typing import Dict
+
+from pymupdf import Document, TextPage, mupdf
+
+from ..utils.text_utils import create_text_page
+
+# size of the first block of the memory pool of a text page, which the pool leaves out
+# of its size
+TEXT_PAGE_POOL_BLOCK = 8192
+
+
+class TextPageCache:
+    """Text layer cache of a document with a byte budget and least recently used eviction"""
+
+    def __init__(self, document: Document, max_bytes: int):
+        self.document = document
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # page index -> (text page, estimated size in bytes)
+        self.text_page_dict = OrderedDict()
+
+    def get(self, page_index: int) -> TextPage:
+        """Get the text page of a page, parsing its content stream on a miss."""
+        item = self.text_page_dict.get(page_index)
+        if item is not None:
+            self.hits += 1
+            self.text_page_dict.move_to_end(page_index)
+            return item[0]
+
+        self.misses += 1
+        text_page = create_text_page(self.document.load_page(page_index))
+        size = self.get_text_page_size(text_page)
+        if size <= self.max_bytes:
+            self.text_page_dict[page_index] = (text_page, size)
+            self.used_bytes += size
+            self.evict()
+        return text_page
+
+    def set_max_bytes(self, max_bytes: int):
+        """set the byte budget of the cache"""
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def evict(self):
+        """evict the least recently used text pages until the cache fits its budget"""
+        while self.used_bytes > self.max_bytes:
+            _, (_, size) = self.text_page_dict.popitem(last=False)
+            self.used_bytes -= size
+            self.evictions += 1
+
+    def statistics(self) -> Dict[str, int]:
+        """get the usage statistics of the cache"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.text_page_dict),
+            "used_bytes": self.used_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    @staticmethod
+    def get_text_page_size(text_page: TextPage) -> int:
+        """get the number of bytes held by a text page from the pool its blocks live in"""
+        # read from the pool in constant time, without walking or extracting the text
+        pool = text_page.this.m_internal.pool
+        return TEXT_PAGE_POOL_BLOCK + mupdf.ll_fz_pool_size(pool)
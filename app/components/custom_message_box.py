@@ -53,11 +53,20 @@ class PasswordMessageBox(MessageBoxBase):
 class InfoDialogBox(MessageBoxBase):
     """Info Dialog Box"""
 
-    def __init__(self, path, doc, parent=None):
+    def __init__(
+        self,
+        path,
+        doc,
+        parent=None,
+        time_to_first_page=None,
+        page_cache_statistics=None,
+    ):
         super().__init__(parent)
 
         self.path = path
         self.document = doc
+        self.time_to_first_page = time_to_first_page
+        self.page_cache_statistics = page_cache_statistics
 
         self.viewLayout.setContentsMargins(24, 16, 24, 24)
         self.cancelButton.setText("Close")
@@ -89,7 +98,19 @@ class InfoDialogBox(MessageBoxBase):
         self.close_button = TransparentToolButton(FluentIcon.CLOSE, self)
         self.close_button.clicked.connect(self.on_close_button_clicked)
 
-        for key, value in get_information(self.path, self.document).items():
+        information = get_information(self.path, self.document)
+        if self.time_to_first_page is not None:
+            information["Time to First Page"] = f"{self.time_to_first_page:.0f} ms"
+        if self.page_cache_statistics is not None:
+            statistics = self.page_cache_statistics
+            information["Page Cache"] = (
+                f"{statistics['hits']} hits, {statistics['misses']} misses, "
+                f"{statistics['evictions']} evictions, "
+                f"{statistics['used_bytes'] / 1024 / 1024:.0f} / "
+                f"{statistics['max_bytes'] / 1024 / 1024:.0f} MB"
+            )
+
+        for key, value in information.items():
             label_1 = StrongBodyLabel(f"{key}:", self)
             self.key_layout.addWidget(label_1)
             label_2 = CaptionLabel(str(value), self)
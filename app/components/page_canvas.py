@@ -0,0 +1,349 @@
+# coding:utf-8
+from bisect import bisect_right
+from itertools import accumulate
+
+from PyQt5.QtCore import Qt, QEvent, QPoint, QPointF, QRect, QRectF, QSize, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QTransform
+from PyQt5.QtWidgets import QAbstractScrollArea, QFrame
+
+from lib import SmoothScrollDelegate, themeColor
+
+from ..utils.shadow_utils import draw_shadow
+
+
+class PageGeometry:
+    """Page rectangles of a document at a zoom level and rotation"""
+
+    def __init__(self, margin=10, spacing=10):
+        self.margin = margin
+        self.spacing = spacing
+        self.zoom = 1.0
+        self.rotation = 0
+        self.size_list = []
+        self.max_width = 0
+        self.max_height = 0
+        # prefix sums of the page sizes at 100%, the offsets of the pages at any zoom
+        # level and rotation are derived from them in constant time
+        self.width_sum_list = [0]
+        self.height_sum_list = [0]
+
+    def __len__(self):
+        return len(self.size_list)
+
+    def add_pages(self, size_list):
+        """add the (width, height) of the next pages at 100%"""
+        self.size_list += size_list
+        self.width_sum_list += accumulate(
+            (width for width, _ in size_list), initial=self.width_sum_list.pop()
+        )
+        self.height_sum_list += accumulate(
+            (height for _, height in size_list), initial=self.height_sum_list.pop()
+        )
+        for width, height in size_list:
+            self.max_width = max(self.max_width, width)
+            self.max_height = max(self.max_height, height)
+
+    def set_transform(self, zoom, rotation):
+        """set the zoom level as a scale factor and the rotation in degrees"""
+        self.zoom = zoom
+        self.rotation = rotation
+
+    def is_rotated(self):
+        """whether pages are laid out on their side"""
+        return self.rotation % 180 != 0
+
+    def get_page_size(self, page_index):
+        """Get the unrotated size of a page at the current zoom."""
+        width, height = self.size_list[page_index]
+        return QSize(round(width * self.zoom), round(height * self.zoom))
+
+    def get_page_top(self, page_index):
+        """Get the top of a page, or below the last page if `page_index` is the page count."""
+        sum_list = self.width_sum_list if self.is_rotated() else self.height_sum_list
+        return (
+            self.margin
+            + round(sum_list[page_index] * self.zoom)
+            + page_index * self.spacing
+        )
+
+    def get_content_size(self):
+        """Get the size of all pages including the margins."""
+        max_width = self.max_height if self.is_rotated() else self.max_width
+        return QSize(
+            round(max_width * self.zoom) + 2 * self.margin,
+            self.get_page_top(len(self)) - self.spacing + self.margin,
+        )
+
+    def get_page_rect(self, page_index):
+        """Get the rotated rectangle of a page in content coordinates."""
+        size = self.get_page_size(page_index)
+        if self.is_rotated():
+            size.transpose()
+
+        x = (self.get_content_size().width() - size.width()) // 2
+        return QRect(QPoint(x, self.get_page_top(page_index)), size)
+
+    def get_page_transform(self, page_index):
+        """Get the transform from unrotated page coordinates to content coordinates."""
+        rect = self.get_page_rect(page_index)
+        transform = QTransform()
+        transform.rotate(self.rotation)
+        rotated_rect = transform.mapRect(
+            QRectF(QRect(QPoint(0, 0), self.get_page_size(page_index)))
+        )
+        return transform * QTransform.fromTranslate(
+            rect.x() - rotated_rect.x(), rect.y() - rotated_rect.y()
+        )
+
+    def get_page_at(self, y):
+        """Get the index of the page at `y` in content coordinates."""
+        page_index = bisect_right(range(len(self) + 1), y, key=self.get_page_top) - 1
+        return min(max(page_index, 0), len(self) - 1)
+
+
+class PageCanvas(QAbstractScrollArea):
+    """Scroll area painting the visible pages of a document on its viewport"""
+
+    # angle delta of a Ctrl + wheel event and the cursor position in the viewport
+    zoom_requested = pyqtSignal(int, QPoint)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.page_geometry = PageGeometry()
+        self.pixmap_dict = {}
+        self.tile_dict = {}
+        # rectangles highlighted on top of each page, in page coordinates at 100%
+        self.highlight_dict = {}
+
+        self.scroll_delegate = SmoothScrollDelegate(self)
+        # installed after the delegate, so Ctrl + wheel is seen before it scrolls
+        self.viewport().installEventFilter(self)
+        self.setFrameShape(QFrame.NoFrame)
+        self.setStyleSheet("border: none; background-color: transparent")
+        self.verticalScrollBar().setSingleStep(20)
+        self.horizontalScrollBar().setSingleStep(20)
+
+    def add_pages(self, size_list):
+        """add the (width, height) of the next pages at 100%"""
+        self.page_geometry.add_pages(size_list)
+        self.update_scroll_bars()
+        self.viewport().update()
+
+    def set_page_transform(self, zoom, rotation, anchor=None):
+        """
+        Lay the pages out at another zoom level or rotation.
+
+        The point of the page under `anchor`, in viewport coordinates, stays in place,
+        the viewport center is used if None. Images are kept unrotated in page
+        coordinates and turned by the painter, so a rotation keeps all of them, while a
+        zoom change drops the tiles and scales the page images until they are rendered
+        again.
+        """
+        if anchor is None:
+            anchor = self.viewport().rect().center()
+
+        page_geometry = self.page_geometry
+        page_index = None
+        if len(page_geometry):
+            pos = QPointF(anchor - self.get_content_offset())
+            page_index = page_geometry.get_page_at(pos.y())
+            transform = page_geometry.get_page_transform(page_index)
+            page_pos = transform.inverted()[0].map(pos) / page_geometry.zoom
+
+        if zoom != page_geometry.zoom:
+            self.clear_tiles()
+        page_geometry.set_transform(zoom, rotation)
+        self.update_scroll_bars()
+
+        if page_index is not None:
+            pos = page_geometry.get_page_transform(page_index).map(page_pos * zoom)
+            delta = pos + QPointF(self.get_content_offset() - anchor)
+            self.horizontalScrollBar().setValue(
+                self.horizontalScrollBar().value() + round(delta.x())
+            )
+            self.verticalScrollBar().setValue(
+                self.verticalScrollBar().value() + round(delta.y())
+            )
+        self.viewport().update()
+
+    def set_pixmap(self, page_index, pixmap):
+        """Set the image of a whole page, a null pixmap releases it."""
+        if pixmap.isNull():
+            self.pixmap_dict.pop(page_index, None)
+        else:
+            self.pixmap_dict[page_index] = pixmap
+        self.update_page(page_index)
+
+    def has_tile(self, page_index, pos):
+        """whether the page has a tile at `pos`"""
+        return pos in self.tile_dict.get(page_index, {})
+
+    def set_tile(self, page_index, pos, pixmap):
+        """Set the tile whose top left corner is at `pos` in page coordinates."""
+        self.tile_dict.setdefault(page_index, {})[pos] = pixmap
+        self.update_page(page_index)
+
+    def retain_tiles(self, page_index, pos_set):
+        """Release every tile of a page whose position is not in `pos_set`."""
+        tile_dict = self.tile_dict.get(page_index, {})
+        for pos in list(tile_dict):
+            if pos not in pos_set:
+                del tile_dict[pos]
+
+        if not tile_dict:
+            self.tile_dict.pop(page_index, None)
+
+    def clear_tiles(self):
+        """release the tiles of all pages"""
+        self.tile_dict.clear()
+        self.viewport().update()
+
+    def set_highlights(self, highlight_dict):
+        """Set the highlighted rectangles of the pages, replacing the previous ones."""
+        page_index_set = set(self.highlight_dict) | set(highlight_dict)
+        self.highlight_dict = highlight_dict
+        for page_index in page_index_set:
+            self.update_page(page_index)
+
+    def get_content_offset(self):
+        """Get the position of the content origin in the viewport."""
+        content_size = self.page_geometry.get_content_size()
+        return QPoint(
+            max((self.viewport().width() - content_size.width()) // 2, 0)
+            - self.horizontalScrollBar().value(),
+            max((self.viewport().height() - content_size.height()) // 2, 0)
+            - self.verticalScrollBar().value(),
+        )
+
+    def get_viewport_rect(self):
+        """Get the viewport rectangle in content coordinates."""
+        return self.viewport().rect().translated(-self.get_content_offset())
+
+    def get_visible_page_range(self):
+        """Get the first and last page index intersecting the viewport."""
+        rect = self.get_viewport_rect()
+        return (
+            self.page_geometry.get_page_at(rect.top()),
+            self.page_geometry.get_page_at(rect.bottom()),
+        )
+
+    def map_to_page(self, page_index, rect):
+        """Map a rectangle in content coordinates to unrotated page coordinates."""
+        transform = self.page_geometry.get_page_transform(page_index)
+        return transform.inverted()[0].mapRect(QRectF(rect))
+
+    def scroll_to_page(self, page_index):
+        """scroll the top of a page to the top of the viewport"""
+        self.verticalScrollBar().setValue(self.page_geometry.get_page_top(page_index))
+
+    def map_from_page(self, page_index, rect):
+        """Map a rectangle in page coordinates at 100% to content coordinates."""
+        zoom = self.page_geometry.zoom
+        transform = QTransform.fromScale(zoom, zoom)
+        transform *= self.page_geometry.get_page_transform(page_index)
+        return transform.mapRect(QRectF(rect))
+
+    def ensure_visible(self, page_index, rect, margin=50):
+        """Scroll the least for a rectangle of a page at 100% to be in the viewport."""
+        rect = self.map_from_page(page_index, rect)
+        viewport_rect = QRectF(self.get_viewport_rect())
+        for scroll_bar, start, end, view_start, view_end in [
+            (
+                self.horizontalScrollBar(),
+                rect.left() - margin,
+                rect.right() + margin,
+                viewport_rect.left(),
+                viewport_rect.right(),
+            ),
+            (
+                self.verticalScrollBar(),
+                rect.top() - margin,
+                rect.bottom() + margin,
+                viewport_rect.top(),
+                viewport_rect.bottom(),
+            ),
+        ]:
+            if start < view_start:
+                scroll_bar.setValue(scroll_bar.value() + round(start - view_start))
+            elif end > view_end:
+                scroll_bar.setValue(scroll_bar.value() + round(end - view_end))
+
+    def update_page(self, page_index):
+        """repaint a page if it is visible"""
+        rect = self.page_geometry.get_page_rect(page_index)
+        self.viewport().update(rect.translated(self.get_content_offset()))
+
+    def update_scroll_bars(self):
+        """update the scroll ranges to the content size"""
+        content_size = self.page_geometry.get_content_size()
+        viewport_size = self.viewport().size()
+
+        self.verticalScrollBar().setPageStep(viewport_size.height())
+        self.verticalScrollBar().setRange(
+            0, max(content_size.height() - viewport_size.height(), 0)
+        )
+        self.horizontalScrollBar().setPageStep(viewport_size.width())
+        self.horizontalScrollBar().setRange(
+            0, max(content_size.width() - viewport_size.width(), 0)
+        )
+
+    def eventFilter(self, obj, e):
+        if (
+            obj is self.viewport()
+            and e.type() == QEvent.Wheel
+            and e.modifiers() & Qt.ControlModifier
+        ):
+            if e.angleDelta().y():
+                self.zoom_requested.emit(e.angleDelta().y(), e.pos())
+            return True
+        return super().eventFilter(obj, e)
+
+    def scrollContentsBy(self, dx, dy):
+        self.viewport().update()
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.update_scroll_bars()
+
+    def paintEvent(self, e):
+        if not len(self.page_geometry):
+            return
+
+        painter = QPainter(self.viewport())
+        painter.setRenderHints(QPainter.Antialiasing | QPainter.SmoothPixmapTransform)
+        offset = QTransform.fromTranslate(
+            self.get_content_offset().x(), self.get_content_offset().y()
+        )
+
+        first, last = self.get_visible_page_range()
+        device_pixel_ratio = self.viewport().devicePixelRatioF()
+        highlight_color = QColor(themeColor())
+        highlight_color.setAlpha(90)
+        for page_index in range(first, last + 1):
+            painter.setTransform(offset)
+            draw_shadow(
+                painter,
+                self.page_geometry.get_page_rect(page_index),
+                device_pixel_ratio,
+            )
+
+            painter.setTransform(
+                self.page_geometry.get_page_transform(page_index) * offset
+            )
+            page_rect = QRectF(
+                QRect(QPoint(0, 0), self.page_geometry.get_page_size(page_index))
+            )
+            pixmap = self.pixmap_dict.get(page_index)
+            if pixmap is None:
+                painter.fillRect(page_rect, Qt.white)
+            else:
+                painter.drawPixmap(page_rect, pixmap, QRectF(pixmap.rect()))
+
+            for (x, y), tile in self.tile_dict.get(page_index, {}).items():
+                painter.drawPixmap(x, y, tile)
+
+            zoom = QTransform.fromScale(
+                self.page_geometry.zoom, self.page_geometry.zoom
+            )
+            for rect in self.highlight_dict.get(page_index, []):
+                painter.fillRect(zoom.mapRect(rect), highlight_color)
@@ -0,0 +1,202 @@
+# coding:utf-8
+
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QListWidgetItem
+
+from lib import (
+    ListWidget,
+    CardWidget,
+    FluentIcon,
+    CaptionLabel,
+    SubtitleLabel,
+    SearchLineEdit,
+    SegmentedWidget,
+    HorizontalSeparator,
+    TransparentToolButton,
+)
+
+
+class SearchView(CardWidget):
+    """Search View"""
+
+    # query typed by the user once typing pauses, or the query of a new search mode
+    query_changed = pyqtSignal(str)
+    # search hit of the clicked result
+    hit_clicked = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.MAX_HITS = 1000
+        # returns the text shown for a hit, only called for results scrolled into view
+        self.snippet_provider = None
+        self.hit_list = []
+        self.indexed_page_count = 0
+        self.page_count = 0
+        # "words" matches the terms of the search index, "text" a substring and
+        # "regex" a regular expression
+        self.mode = "words"
+        self.searched_page_count = 0
+        self.candidate_page_count = 0
+        # searched pages whose batch failed, counted as searched without hits
+        self.failed_page_count = 0
+        self.error = ""
+
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(10, 10, 10, 10)
+        self.main_layout.setSpacing(10)
+
+        self.title_layout = QHBoxLayout()
+        self.title_layout.setContentsMargins(0, 0, 0, 0)
+        self.title_layout.setSpacing(10)
+
+        self.query_timer = QTimer(self)
+        self.query_timer.setSingleShot(True)
+        self.query_timer.setInterval(200)
+        self.query_timer.timeout.connect(
+            lambda: self.query_changed.emit(self.search_line_edit.text())
+        )
+
+        self.init_widget()
+        self.init_layout()
+
+    def init_widget(self):
+        """initialize widget"""
+        self.title_text = SubtitleLabel("Search", self)
+        self.close_button = TransparentToolButton(FluentIcon.CLOSE, self)
+
+        self.sep = HorizontalSeparator(self)
+
+        self.search_line_edit = SearchLineEdit(self)
+        self.search_line_edit.setPlaceholderText("Search in document")
+        self.search_line_edit.textChanged.connect(self.query_timer.start)
+        self.search_line_edit.searchSignal.connect(self.query_changed)
+
+        self.mode_pivot = SegmentedWidget(self)
+        for mode, text in [("words", "Words"), ("text", "Text"), ("regex", "Regex")]:
+            self.mode_pivot.addItem(
+                routeKey=mode, text=text, onClick=lambda m=mode: self.set_mode(m)
+            )
+        self.mode_pivot.setCurrentItem(self.mode)
+
+        self.status_label = CaptionLabel(self)
+
+        self.result_list = ListWidget(self)
+        self.result_list.setWordWrap(True)
+        self.result_list.itemClicked.connect(
+            lambda item: self.hit_clicked.emit(item.data(Qt.UserRole))
+        )
+        self.result_list.verticalScrollBar().valueChanged.connect(
+            self.update_visible_snippets
+        )
+        self.setFixedWidth(350)
+
+    def init_layout(self):
+        """initialize layout"""
+        self.title_layout.addWidget(self.title_text)
+        self.title_layout.addStretch()
+        self.title_layout.addWidget(self.close_button)
+        self.main_layout.addLayout(self.title_layout)
+        self.main_layout.addWidget(self.sep)
+        self.main_layout.addWidget(self.search_line_edit)
+        self.main_layout.addWidget(self.mode_pivot)
+        self.main_layout.addWidget(self.status_label)
+        self.main_layout.addWidget(self.result_list)
+
+    def set_mode(self, mode):
+        """set the search mode and search again"""
+        if mode == self.mode:
+            return
+
+        self.mode = mode
+        self.mode_pivot.setCurrentItem(mode)
+        self.query_timer.stop()
+        self.query_changed.emit(self.search_line_edit.text())
+
+    def set_hits(self, hit_list, error=""):
+        """show the hits of a new query, or why it can not be searched"""
+        self.error = error
+        self.searched_page_count = self.candidate_page_count = 0
+        self.failed_page_count = 0
+        self.hit_list = []
+        self.result_list.clear()
+        self.append_hits(hit_list)
+
+    def append_hits(self, hit_list):
+        """append the hits found in newly indexed pages"""
+        hit_list = hit_list[: self.MAX_HITS - len(self.hit_list)]
+        self.hit_list += hit_list
+        for hit in hit_list:
+            item = QListWidgetItem(f"Page {hit.page_index + 1}")
+            item.setData(Qt.UserRole, hit)
+            self.result_list.addItem(item)
+
+        self.update_visible_snippets()
+        self.update_status()
+
+    def set_progress(self, indexed_page_count, page_count):
+        """set how many pages of the document are indexed"""
+        self.indexed_page_count = indexed_page_count
+        self.page_count = page_count
+        self.update_status()
+
+    def set_search_progress(
+        self, searched_page_count, candidate_page_count, failed_page_count=0
+    ):
+        """set how many of the pages that may match a text search are searched"""
+        self.searched_page_count = searched_page_count
+        self.candidate_page_count = candidate_page_count
+        self.failed_page_count = failed_page_count
+        self.update_status()
+
+    def update_status(self):
+        """show the hit count and the indexing progress"""
+        if self.error:
+            self.status_label.setText(self.error)
+            return
+
+        if not self.search_line_edit.text().strip():
+            status = ""
+        elif len(self.hit_list) >= self.MAX_HITS:
+            status = f"First {self.MAX_HITS} results"
+        else:
+            status = f"{len(self.hit_list)} results"
+
+        if self.searched_page_count < self.candidate_page_count:
+            status += (
+                f", searching {self.searched_page_count} / "
+                f"{self.candidate_page_count} pages"
+            )
+        if self.failed_page_count:
+            status += f", {self.failed_page_count} pages could not be searched"
+        if self.indexed_page_count < self.page_count:
+            progress = f"indexing {self.indexed_page_count} / {self.page_count} pages"
+            status = f"{status}, {progress}" if status else progress.capitalize()
+        self.status_label.setText(status)
+
+    def update_visible_snippets(self):
+        """fill in the text of the results in the viewport"""
+        if self.snippet_provider is None or not self.result_list.count():
+            return
+
+        viewport = self.result_list.viewport()
+        first = self.result_list.indexAt(viewport.rect().topLeft()).row()
+        last = self.result_list.indexAt(viewport.rect().bottomLeft()).row()
+        if first < 0:
+            first = 0
+        if last < 0:
+            last = self.result_list.count() - 1
+
+        for row in range(first, last + 1):
+            item = self.result_list.item(row)
+            hit = item.data(Qt.UserRole)
+            if item.data(Qt.UserRole + 1):
+                continue
+
+            item.setData(Qt.UserRole + 1, True)
+            item.setText(
+                f"Page {hit.page_index + 1}: {self.snippet_provider(hit)}"
+            )
+
+    def resizeEvent(self, e):
+        super().resizeEvent(e)
+        self.update_visible_snippets()
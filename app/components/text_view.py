@@ -1,6 +1,9 @@
 # coding:utf-8
+from bisect import bisect_right
+from collections import OrderedDict
 
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QPoint, pyqtSignal
+from PyQt5.QtGui import QTextCursor, QTextDocument
 from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QStackedWidget
 
 from lib import (
@@ -14,6 +17,271 @@ from lib import (
     TransparentToolButton,
 )
 
+from ..utils.text_utils import IMAGE_URL_SCHEME
+
+
+class PageTextDocument(QTextDocument):
+    """Text document decoding the images of pages on demand"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.MAX_IMAGES = 16
+        # returns the image of an xref, only called for images that are painted
+        self.image_provider = None
+        self.image_dict = OrderedDict()
+
+    def loadResource(self, type, url):
+        if (
+            type != QTextDocument.ImageResource
+            or url.scheme() != IMAGE_URL_SCHEME
+            or self.image_provider is None
+        ):
+            return super().loadResource(type, url)
+
+        # images are not handed to the resource cache of the document, which would
+        # keep every image ever shown, but to a small cache of recently painted ones
+        xref = int(url.path())
+        if xref in self.image_dict:
+            self.image_dict.move_to_end(xref)
+        else:
+            self.image_dict[xref] = self.image_provider(xref)
+            if len(self.image_dict) > self.MAX_IMAGES:
+                self.image_dict.popitem(last=False)
+        return self.image_dict[xref]
+
+
+class PageTextEdit(TextEdit):
+    """Text edit holding only the text or html of the pages around its viewport"""
+
+    # page count of the page at the top of the viewport, when scrolled by the user
+    page_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None, is_html=False):
+        super().__init__(parent)
+        self.MARGIN_PAGES = 2
+        # height of a page whose content is not extracted yet, so the window does not
+        # take in every page while their content is on its way
+        self.PLACEHOLDER_LINES = 20
+        self.is_html = is_html
+        # returns the text or html of a page, or None until a worker extracted it and
+        # `update_page` is called, only called for pages that have content
+        self.text_provider = None
+        self.has_text_list = []
+        self.first_page = 0
+        # positions of the loaded pages in the document, the text of page
+        # `first_page + i` spans from `position_list[i]` to `position_list[i + 1]`
+        self.position_list = [0]
+        self.top_page = 0
+        # page to scroll to once enough pages are added to bring it to the top
+        self.pending_page = None
+        self.is_finished = False
+        self.is_filling = False
+
+        self.setDocument(PageTextDocument(self))
+        self.document().setDefaultFont(self.font())
+        self.setReadOnly(True)
+        self.setUndoRedoEnabled(False)
+        self.verticalScrollBar().valueChanged.connect(self.on_scrolled)
+
+    @property
+    def last_page(self):
+        """index after the last loaded page"""
+        return self.first_page + len(self.position_list) - 1
+
+    def add_pages(self, has_text_list):
+        """add the next pages, pages without content take no space"""
+        self.has_text_list += has_text_list
+        if self.pending_page is None:
+            self.fill_window()
+        else:
+            self.load_pending_page()
+
+    def finish_pages(self):
+        """stop waiting for pages once all of them are added"""
+        self.is_finished = True
+        if self.pending_page is not None:
+            self.load_pending_page()
+
+    def insert_page_text(self, cursor, page_index):
+        """insert the content of a page at a cursor, ending with a new block"""
+        if not self.has_text_list[page_index]:
+            return
+
+        text = self.text_provider(page_index)
+        if text is None:
+            cursor.insertText("\n" * self.PLACEHOLDER_LINES)
+            return
+        if not text:
+            return
+
+        if self.is_html:
+            cursor.insertHtml(text)
+            cursor.insertBlock()
+        elif text.endswith("\n"):
+            cursor.insertText(text)
+        else:
+            cursor.insertText(text + "\n")
+
+    def update_page(self, page_index):
+        """replace the placeholder of a loaded page once its content is extracted"""
+        if not self.first_page <= page_index < self.last_page:
+            return
+
+        i = page_index - self.first_page
+        start, end = self.position_list[i : i + 2]
+        position, top = self.get_top_anchor()
+        self.is_filling = True
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.insert_page_text(cursor, page_index)
+        length = cursor.position() - end
+        self.position_list[i + 1 :] = [p + length for p in self.position_list[i + 1 :]]
+
+        # keep the text at the top of the viewport in place
+        if position >= end:
+            position += length
+        elif position > start:
+            position = start
+        self.restore_top_anchor(position, top)
+        self.is_filling = False
+
+        if self.pending_page is None:
+            self.fill_window()
+        else:
+            self.load_pending_page()
+
+    def get_page_at(self, position):
+        """Get the index of the page at a position of the document."""
+        i = bisect_right(self.position_list, position) - 1
+        return self.first_page + min(max(i, 0), len(self.position_list) - 2)
+
+    def get_visible_page_range(self):
+        """Get the first and last page index intersecting the viewport."""
+        if len(self.position_list) < 2:
+            return self.first_page, self.first_page
+
+        # lines touching the edges of the viewport with their border are not visible
+        top = self.cursorForPosition(QPoint(0, 1)).position()
+        bottom = self.cursorForPosition(
+            QPoint(0, self.viewport().height() - 2)
+        ).position()
+        return self.get_page_at(top), self.get_page_at(bottom)
+
+    def fill_window(self):
+        """load the pages around the viewport and unload the others"""
+        if self.is_filling:
+            return
+
+        self.is_filling = True
+        page_count = len(self.has_text_list)
+        while True:
+            top_page, bottom_page = self.get_visible_page_range()
+            first = max(top_page - self.MARGIN_PAGES, 0)
+            last = min(bottom_page + 1 + self.MARGIN_PAGES, page_count)
+            if self.last_page < last:
+                self.insert_page(self.last_page, at_end=True)
+            elif self.first_page > first:
+                self.insert_page(self.first_page - 1, at_end=False)
+            elif self.first_page < first:
+                self.remove_page(at_end=False)
+            elif self.last_page > last:
+                self.remove_page(at_end=True)
+            else:
+                break
+        self.is_filling = False
+
+    def insert_page(self, page_index, at_end):
+        """insert the text of a page before or after the loaded pages"""
+        cursor = QTextCursor(self.document())
+        if at_end:
+            cursor.setPosition(self.position_list[-1])
+            self.insert_page_text(cursor, page_index)
+            self.position_list.append(cursor.position())
+            return
+
+        position, top = self.get_top_anchor()
+        self.insert_page_text(cursor, page_index)
+        length = cursor.position()
+        self.first_page = page_index
+        self.position_list = [0] + [p + length for p in self.position_list]
+        self.restore_top_anchor(position + length, top)
+
+    def remove_page(self, at_end):
+        """remove the text of the first or last loaded page"""
+        cursor = QTextCursor(self.document())
+        if at_end:
+            cursor.setPosition(self.position_list[-2])
+            cursor.setPosition(self.position_list[-1], QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+            self.position_list.pop()
+            return
+
+        position, top = self.get_top_anchor()
+        length = self.position_list[1]
+        cursor.setPosition(length, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+        self.first_page += 1
+        self.position_list = [p - length for p in self.position_list[1:]]
+        self.restore_top_anchor(position - length, top)
+
+    def get_top_anchor(self):
+        """get the document position at the top of the viewport and its y coordinate"""
+        cursor = self.cursorForPosition(QPoint(0, 0))
+        return cursor.position(), self.cursorRect(cursor).top()
+
+    def restore_top_anchor(self, position, top):
+        """scroll a document position back to `top` after the text above it changed"""
+        position = min(max(position, 0), self.document().characterCount() - 1)
+        cursor = QTextCursor(self.document())
+        cursor.setPosition(position)
+        scroll_bar = self.verticalScrollBar()
+        scroll_bar.setValue(scroll_bar.value() + self.cursorRect(cursor).top() - top)
+
+    def scroll_to_page(self, page_index):
+        """scroll the top of a page to the top of the viewport, once it is added"""
+        self.pending_page = max(page_index, 0)
+        self.load_pending_page()
+
+    def load_pending_page(self):
+        """load the pages around the pending page and scroll it to the top"""
+        page_index = self.pending_page
+        if self.is_finished:
+            page_index = max(min(page_index, len(self.has_text_list) - 1), 0)
+        elif page_index >= len(self.has_text_list):
+            return
+
+        self.is_filling = True
+        self.clear()
+        self.first_page = page_index
+        self.position_list = [0]
+        self.top_page = page_index
+        self.is_filling = False
+        self.fill_window()
+
+        # pages above it were loaded while the page was at the top of the viewport
+        self.is_filling = True
+        self.restore_top_anchor(self.position_list[page_index - self.first_page], 0)
+        self.is_filling = False
+        self.fill_window()
+
+        # the page stays pending while too few pages follow it to fill the viewport,
+        # pages without content take no space, so a later page may be at the top
+        if self.is_finished or self.get_visible_page_range()[0] >= page_index:
+            self.pending_page = None
+
+    def on_scrolled(self):
+        """on scrolled"""
+        if self.is_filling or self.pending_page is not None:
+            return
+
+        self.fill_window()
+        top_page = self.get_visible_page_range()[0]
+        if top_page != self.top_page:
+            self.top_page = top_page
+            self.page_changed.emit(top_page + 1)
+
 
 class TextView(CardWidget):
     """Text View"""
@@ -35,6 +303,7 @@ class TextView(CardWidget):
 
         self.init_widget()
         self.init_layout()
+        self.init_sub_interface()
 
     def init_widget(self):
         """initialize widget"""
@@ -51,25 +320,39 @@ class TextView(CardWidget):
             self.on_current_index_changed
         )
 
-        self.text_area = TextEdit(self)
-        self.text_area.setReadOnly(True)
-        self.html_area = TextEdit(self)
-        self.html_area.setReadOnly(True)
+        self.text_area = PageTextEdit(self)
+        self.html_area = PageTextEdit(self, is_html=True)
+        self.has_text = False
 
-    def init_sub_interface(self, text, html):
+    def init_sub_interface(self):
         """initialize sub interface"""
-        self.text_area.setText(text)
-        self.html_area.setHtml(html)
-
         self.add_sub_interface(self.text_area, "text_area", "Text")
         self.add_sub_interface(self.html_area, "html_area", "Html")
         self.stacked_widget.setCurrentWidget(self.text_area)
-        if len(text) > 0:
-            self.pivot.setCurrentItem("text_area")
-        else:
-            self.pivot.setCurrentItem("html_area")
+        self.pivot.setCurrentItem("text_area")
         self.setFixedWidth(350)
 
+    def append_pages(self, flag_list):
+        """append the next pages from their (may have text, has images)"""
+        has_text_list = [has_text for has_text, _ in flag_list]
+        self.has_text = self.has_text or any(has_text_list)
+        self.text_area.add_pages(has_text_list)
+        self.html_area.add_pages(
+            [has_text or has_images for has_text, has_images in flag_list]
+        )
+
+    def scroll_to_page(self, page_index):
+        """scroll both areas to a page"""
+        self.text_area.scroll_to_page(page_index)
+        self.html_area.scroll_to_page(page_index)
+
+    def finish_pages(self):
+        """show the html of documents without any text once all pages are appended"""
+        self.text_area.finish_pages()
+        self.html_area.finish_pages()
+        if not self.has_text:
+            self.stacked_widget.setCurrentWidget(self.html_area)
+
     def init_layout(self):
         """initialize layout"""
         self.title_layout.addWidget(self.title_text)
@@ -21,12 +21,15 @@ class TocView(CardWidget):
     """Table of Content View"""
 
     content_clicked = pyqtSignal(int)
+    content_hovered = pyqtSignal(int)
 
     def __init__(self, doc, parent=None):
         super().__init__(parent)
 
+        self.document = doc
         self.toc = doc.get_toc()
         self.page_count = doc.page_count
+        self.toc_image = None
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(10, 10, 10, 10)
@@ -61,14 +64,18 @@ class TocView(CardWidget):
                 self, showMenuButton=False, showReturnButton=False
             )
 
-    def init_sub_interface(self, pixmap_list):
+    def init_sub_interface(self, file_identity, page_size_list):
         """initialize sub interface"""
-        self.toc_image = TocImage(pixmap_list, self.page_count, self)
+        self.toc_image = TocImage(
+            self.document, file_identity, page_size_list, self
+        )
         self.toc_image.content_clicked.connect(self.on_content_clicked)
+        self.toc_image.content_hovered.connect(self.content_hovered)
 
         if self.toc:
             self.toc_list = TocList(self.toc, self)
             self.toc_list.content_clicked.connect(self.on_content_clicked)
+            self.toc_list.content_hovered.connect(self.content_hovered)
 
             self.add_sub_interface(self.toc_list, FluentIcon.MENU)
             self.add_sub_interface(self.toc_image, FluentIcon.PHOTO)
@@ -1,6 +1,7 @@
 # coding:utf-8
 
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, QEvent, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap
 from PyQt5.QtWidgets import QVBoxLayout, QHBoxLayout, QWidget
 
 from lib import (
@@ -14,11 +15,17 @@ from lib import (
     NavigationItemPosition,
 )
 
+from ..common.page_cache import pageCache, PageCacheKey
+from ..components.page_canvas import PageGeometry
+from ..common.disk_cache import diskCache
+from ..common.render_service import renderService, RenderJob
+
 
 class TocList(QWidget):
     """Table of Content List Widget"""
 
     content_clicked = pyqtSignal(int)
+    content_hovered = pyqtSignal(int)
 
     def __init__(self, toc, parent=None):
         super().__init__(parent)
@@ -26,6 +33,7 @@ class TocList(QWidget):
 
         self.toc = toc
         self.stack = []
+        self.item_page_dict = {}
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
@@ -63,7 +71,7 @@ class TocList(QWidget):
             parent = self.stack[-2] if level > 1 else None
 
             routeKey = interface.objectName()
-            self.navigation.addItem(
+            item = self.navigation.addItem(
                 routeKey=routeKey,
                 icon="",
                 text=TextWrap.wrap(title, 28, False)[0],
@@ -72,96 +80,269 @@ class TocList(QWidget):
                 tooltip="",
                 parentRouteKey=parent.objectName() if parent else None,
             )
+            self.item_page_dict[item] = page
+            item.installEventFilter(self)
+
+    def eventFilter(self, obj, e):
+        """emit `content_hovered` when the cursor enters an item"""
+        if e.type() == QEvent.Enter and obj in self.item_page_dict:
+            self.content_hovered.emit(self.item_page_dict[obj])
+
+        return super().eventFilter(obj, e)
 
 
 class TocImage(QWidget):
-    """Table of Content Image Widget"""
+    """Table of Content Image Widget holding page cards only for the pages near its viewport"""
 
     content_clicked = pyqtSignal(int)
+    content_hovered = pyqtSignal(int)
 
-    def __init__(self, pixmap_list, page_count, parent=None):
+    def __init__(self, doc, file_identity, page_size_list, parent=None):
         super().__init__(parent)
         self.setObjectName("TocImage")
 
-        self.pixmap_list = pixmap_list
-        self.page_count = page_count
+        self.document = doc
+        self.file_identity = file_identity
+        self.page_count = doc.page_count
+        self.page_size_list = page_size_list
         self.current_page = None
+        # page count -> page card of the pages near the viewport, cards scrolled away
+        # are reused for the pages scrolled in
         self.page_card_dict = {}
+        self.free_card_list = []
+        self.rendered_page_set = set()
+        self.pending_job_dict = {}
+        self.THUMBNAIL_WIDTH = 150
+        self.PRELOAD_CARDS = 2
+
+        renderService.page_rendered.connect(self.on_page_rendered)
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setAlignment(Qt.AlignCenter)
         self.main_layout.setContentsMargins(0, 0, 0, 0)
         self.main_layout.setSpacing(10)
 
-        self.page_layout = QVBoxLayout()
-        self.page_layout.setAlignment(Qt.AlignCenter)
-
         self.init_widget()
         self.init_layout()
 
     def init_widget(self):
         """initialize widget"""
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(0)
+        self.render_timer.timeout.connect(self.render_visible_thumbnails)
+
         self.scroll_area = ScrollArea(self)
         self.scroll_area.setStyleSheet(
             "border: none; background-color: transparent"
         )
         self.scroll_area.setWidgetResizable(True)
         self.scroll_area.horizontalScrollBar().setValue(1900)
+        # the value must not reach `QTimer.start`, which would take it as the interval
+        self.scroll_area.verticalScrollBar().valueChanged.connect(
+            lambda: self.render_timer.start()
+        )
 
         self.scroll_widget = QWidget()
 
-        for i in range(self.page_count):
-            page_card = PageCard(self.pixmap_list[i], i + 1)
-            page_card.clicked.connect(self.on_page_card_clicked)
-            page_card.setStyleSheet(
-                "background: transparent; border-radius: 5px;"
-            )
-            self.page_card_dict[i + 1] = page_card
-            self.page_layout.addWidget(page_card)
-
+        # the card geometry is laid out like the pages of the page canvas, the height
+        # a card adds to its thumbnail is measured on the first card
+        page_card = self.create_page_card()
+        self.free_card_list.append(page_card)
+        extra_height = page_card.sizeHint().height() - page_card.image_height()
+        self.card_geometry = PageGeometry()
+        self.card_geometry.add_pages(
+            [
+                (self.THUMBNAIL_WIDTH, self.get_thumbnail_height(i) + extra_height)
+                for i in range(self.page_count)
+            ]
+        )
+        self.scroll_widget.setFixedHeight(
+            self.card_geometry.get_content_size().height()
+        )
         self.set_current_page_card(1)
 
     def init_layout(self):
         """initialize layout"""
-        self.scroll_widget.setLayout(self.page_layout)
         self.main_layout.addWidget(self.scroll_widget)
         self.scroll_area.setWidget(self.scroll_widget)
         self.main_layout.addWidget(self.scroll_area)
 
-    def on_page_card_clicked(self):
-        """on page card clicked"""
-        clicked_page = self.sender()
-        self.content_clicked.emit(clicked_page.page_count)
+    def get_thumbnail_height(self, page_index):
+        """get the height of the thumbnail of a page"""
+        width, height = self.page_size_list[page_index]
+        return int(self.THUMBNAIL_WIDTH * height / width)
 
-        if self.current_page:
-            self.current_page.setStyleSheet(
-                "background: transparent; border-radius: 5px;"
-            )
+    def create_page_card(self):
+        """create a page card, which is assigned a page once it is placed"""
+        page_card = PageCard(
+            1, self.THUMBNAIL_WIDTH, self.THUMBNAIL_WIDTH, self.scroll_widget
+        )
+        page_card.clicked.connect(self.on_page_card_clicked)
+        page_card.hovered.connect(self.on_page_card_hovered)
+        page_card.hide()
+        return page_card
+
+    def get_visible_card_range(self):
+        """get the first and last page index of the cards near the viewport"""
+        top = self.scroll_area.verticalScrollBar().value()
+        bottom = top + self.scroll_area.viewport().height()
+        return (
+            max(self.card_geometry.get_page_at(top) - self.PRELOAD_CARDS, 0),
+            min(
+                self.card_geometry.get_page_at(bottom) + self.PRELOAD_CARDS,
+                self.page_count - 1,
+            ),
+        )
 
-        clicked_page.setStyleSheet(
-            f"background: rgba{themeColor().getRgb()}; border-radius: 5px;"
+    def place_page_cards(self, first, last):
+        """Release the page cards outside a range of pages and place the ones inside."""
+        for page_count in list(self.page_card_dict):
+            if first <= page_count - 1 <= last:
+                continue
+
+            page_card = self.page_card_dict.pop(page_count)
+            page_card.hide()
+            page_card.clear_pixmap()
+            self.free_card_list.append(page_card)
+            self.rendered_page_set.discard(page_count)
+            if page_count in self.pending_job_dict:
+                renderService.cancel(self.pending_job_dict.pop(page_count))
+
+        x = (self.scroll_area.viewport().width() - self.THUMBNAIL_WIDTH) // 2
+        for page_index in range(first, last + 1):
+            page_card = self.page_card_dict.get(page_index + 1)
+            if page_card is None:
+                page_card = (
+                    self.free_card_list.pop()
+                    if self.free_card_list
+                    else self.create_page_card()
+                )
+                page_card.set_page(
+                    page_index + 1,
+                    self.THUMBNAIL_WIDTH,
+                    self.get_thumbnail_height(page_index),
+                )
+                page_card.set_selected(page_index + 1 == self.current_page)
+                self.page_card_dict[page_index + 1] = page_card
+
+            rect = self.card_geometry.get_page_rect(page_index)
+            page_card.setGeometry(x, rect.y(), rect.width(), rect.height())
+            page_card.show()
+
+    def get_cache_key(self, page_index):
+        """get the page cache key of a thumbnail"""
+        width = self.page_size_list[page_index][0]
+        return PageCacheKey(
+            self.file_identity,
+            page_index,
+            self.THUMBNAIL_WIDTH / width,
+            0,
+            self.devicePixelRatioF(),
         )
-        self.current_page = clicked_page
 
-    def set_current_page_card(self, page_count):
-        """set current page card"""
-        if self.current_page:
-            self.current_page.setStyleSheet(
-                "background: transparent; border-radius: 5px;"
+    def render_visible_thumbnails(self):
+        """Show the thumbnails of the pages near the viewport and release the others."""
+        if not self.isVisible():
+            return
+
+        first, last = self.get_visible_card_range()
+        self.place_page_cards(first, last)
+
+        for page_index in range(first, last + 1):
+            page_count = page_index + 1
+            if page_count in self.rendered_page_set:
+                continue
+
+            self.rendered_page_set.add(page_count)
+            key = self.get_cache_key(page_index)
+            pixmap = pageCache.get(key)
+            if pixmap is not None:
+                self.page_card_dict[page_count].set_pixmap(pixmap)
+                continue
+
+            job = RenderJob(
+                self,
+                self.document.name,
+                self.document.password,
+                key.page_index,
+                key.zoom,
+                cache_path=diskCache.get_file_path(key),
+                device_pixel_ratio=key.device_pixel_ratio,
             )
+            self.pending_job_dict[page_count] = job
+            renderService.render(job)
 
-        self.page_card_dict[page_count].setStyleSheet(
-            f"background: rgba{themeColor().getRgb()}; border-radius: 5px;"
+    def on_page_rendered(self, job):
+        """on page rendered"""
+        if job.owner is not self:
+            return
+
+        page_count = job.page_index + 1
+        if self.pending_job_dict.get(page_count) is not job:
+            return
+
+        del self.pending_job_dict[page_count]
+        if job.image.isNull():
+            self.rendered_page_set.discard(page_count)
+            return
+
+        pixmap = QPixmap.fromImage(job.image)
+        pageCache.put(self.get_cache_key(job.page_index), pixmap)
+        self.page_card_dict[page_count].set_pixmap(pixmap)
+
+    def showEvent(self, event):
+        """Handle the show event"""
+        super().showEvent(event)
+        self.render_timer.start()
+
+    def resizeEvent(self, event):
+        """Handle the resize event"""
+        super().resizeEvent(event)
+        self.render_timer.start()
+
+    def on_page_card_clicked(self):
+        """on page card clicked"""
+        page_count = self.sender().page_count
+        self.content_clicked.emit(page_count)
+        self.set_current_page_card(page_count)
+
+    def on_page_card_hovered(self):
+        """on page card hovered"""
+        self.content_hovered.emit(self.sender().page_count)
+
+    def set_current_page_card(self, page_count):
+        """set current page card"""
+        if not 1 <= page_count <= self.page_count:
+            return
+
+        if self.current_page in self.page_card_dict:
+            self.page_card_dict[self.current_page].set_selected(False)
+        if page_count in self.page_card_dict:
+            self.page_card_dict[page_count].set_selected(True)
+        self.current_page = page_count
+
+    def scroll_to_page_card(self, page_count):
+        """select a page card and scroll it to the upper third of the viewport"""
+        if not 1 <= page_count <= self.page_count:
+            return
+
+        self.set_current_page_card(page_count)
+        rect = self.card_geometry.get_page_rect(page_count - 1)
+        self.scroll_area.verticalScrollBar().setValue(
+            int(rect.y() - self.scroll_area.height() / 3 + rect.height() / 3)
         )
-        self.current_page = self.page_card_dict[page_count]
 
 
 class PageCard(CardWidget):
     """Page Card Widget"""
 
-    def __init__(self, pixmap, page_count, parent=None):
+    hovered = pyqtSignal()
+
+    def __init__(self, page_count, width, height, parent=None):
         super().__init__(parent)
         self.setObjectName(f"PageCard-{page_count}")
+        self.setStyleSheet("background: transparent; border-radius: 5px;")
 
         self.page_count = page_count
 
@@ -175,11 +356,49 @@ class PageCard(CardWidget):
         self.bottom_layout.setContentsMargins(0, 0, 0, 0)
         self.bottom_layout.setSpacing(0)
 
-        self.page_image_label = ImageLabel(pixmap, self)
+        self.page_image_label = ImageLabel(self)
         self.page_image_label.setBorderRadius(5, 5, 5, 5)
-        self.page_image_label.scaledToWidth(150)
+        self.page_image_label.setFixedSize(width, height)
         self.main_layout.addWidget(self.page_image_label)
 
         self.page_count_label = StrongBodyLabel(str(page_count), self)
         self.bottom_layout.addWidget(self.page_count_label)
         self.main_layout.addLayout(self.bottom_layout)
+
+    def enterEvent(self, e):
+        """Handle the enter event"""
+        super().enterEvent(e)
+        self.hovered.emit()
+
+    def set_page(self, page_count, width, height):
+        """show another page, without its thumbnail"""
+        self.setObjectName(f"PageCard-{page_count}")
+        self.page_count = page_count
+        self.page_count_label.setText(str(page_count))
+        self.page_image_label.setImage()
+        self.page_image_label.setFixedSize(width, height)
+
+    def set_selected(self, is_selected):
+        """highlight the card of the current page"""
+        if is_selected:
+            self.setStyleSheet(
+                f"background: rgba{themeColor().getRgb()}; border-radius: 5px;"
+            )
+        else:
+            self.setStyleSheet("background: transparent; border-radius: 5px;")
+
+    def image_height(self):
+        """get the height of the thumbnail"""
+        return self.page_image_label.height()
+
+    def set_pixmap(self, pixmap):
+        """set pixmap"""
+        width = self.page_image_label.width()
+        self.page_image_label.setImage(pixmap)
+        self.page_image_label.scaledToWidth(width)
+
+    def clear_pixmap(self):
+        """clear pixmap"""
+        size = self.page_image_label.size()
+        self.page_image_label.setImage()
+        self.page_image_label.setFixedSize(size)
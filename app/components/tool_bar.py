@@ -62,6 +62,8 @@ class ToolBar(CardWidget):
 
         self.info_button = TransparentToolButton(FluentIcon.INFO, self)
         self.main_layout.addWidget(self.info_button)
+        self.search_button = TransparentToggleToolButton(FluentIcon.SEARCH, self)
+        self.main_layout.addWidget(self.search_button)
         self.more_button = TransparentToggleToolButton(FluentIcon.FONT, self)
         self.main_layout.addWidget(self.more_button)
 
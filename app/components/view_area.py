@@ -1,25 +1,42 @@
 # coding:utf-8
+import re
+import math
+import time
 
-from PyQt5.QtCore import Qt, QRect, pyqtSignal
-from PyQt5.QtGui import QImage, QPixmap, QColor, QTransform
-from PyQt5.QtWidgets import QVBoxLayout, QWidget, QGraphicsDropShadowEffect
-
-from pymupdf import Identity
-from pymupdf.utils import get_pixmap
+from bisect import bisect_left
+from PyQt5.QtCore import Qt, QRectF, QTimer, pyqtSignal
+from PyQt5.QtGui import QPixmap
+from PyQt5.QtWidgets import QVBoxLayout
 
 from lib import (
     InfoBar,
     CardWidget,
-    ScrollArea,
-    PixmapLabel,
     toggleTheme,
     InfoBarPosition,
 )
 
 from ..components.tool_bar import ToolBar
+from ..components.page_canvas import PageCanvas
 from ..components.toc_view import TocView
 from ..components.text_view import TextView
+from ..components.search_view import SearchView
 from ..components.custom_message_box import InfoDialogBox
+from ..common.page_cache import pageCache, PageCacheKey
+from ..common.disk_cache import diskCache
+from ..common.render_service import (
+    renderService,
+    RenderJob,
+    TextJob,
+    ContentJob,
+    IndexJob,
+    SearchJob,
+)
+from ..common.text_page_cache import TextPageCache
+from ..common.search_index import SearchIndex, TextHit
+from ..utils.file_utils import get_file_identity
+from ..utils.render_utils import get_page_size_list, read_document_image
+from ..utils.text_utils import get_regex_literals, get_words
+from ..common.config import cfg
 
 
 class ViewArea(CardWidget):
@@ -27,40 +44,128 @@ class ViewArea(CardWidget):
 
     zoom_changed = pyqtSignal(int)
 
-    def __init__(self, path, doc, parent=None):
+    def __init__(self, path, doc, parent=None, open_time=None):
         super().__init__(parent)
 
+        # `time.perf_counter` when the file was dropped or selected, shown with the file
+        # information once the first page is on screen
+        self.open_time = time.perf_counter() if open_time is None else open_time
+        self.time_to_first_page = None
         self.path = path
         self.document = doc
         self.page_count = doc.page_count
-        self.page_widget_list = []
-        self.page_pixmap_list = []
-        self.page_pixmap_dict = {}
+        # zoom level, device pixel ratio and whether it is a draft of the image shown
+        # on each page, images rendered for another view state are previews
+        self.loaded_page_dict = {}
+        self.pending_job_dict = {}
+        self.pending_tile_dict = {}
+        self.prefetch_job_dict = {}
+        self.render_generation = 0
+        self.scroll_velocity = 0.0
+        self.last_scroll_value = 0
+        self.last_scroll_time = time.perf_counter()
+        self.page_size_list = []
+        self.file_identity = get_file_identity(path)
+        self.device_pixel_ratio = self.devicePixelRatioF()
+        self.window_handle = None
         self.current_page = 1
         self.page_rotation = 0
         self.is_fit_page = False
         self.show_toc_view = False
         self.show_text_view = False
-        self.text = ""
-        self.html = ""
+        self.show_search_view = False
+        # text is only extracted once the text view is first shown
+        self.text_job = None
+        self.extracted_page_count = 0
+        # text and html of the pages shown by the text view, extracted in the workers, and
+        # the pages still waiting for their text or html
+        self.page_content_dict = {}
+        self.missing_page_dict = {False: set(), True: set()}
+        self.content_job_dict = {False: None, True: None}
+        # text layers of the pages for the rectangles of search hits only; the text of
+        # the pages is extracted once by the index workers and kept by the search index
+        self.text_page_cache = TextPageCache(
+            doc, cfg.get(cfg.textPageCacheSize) * 1024 * 1024
+        )
+        # the search index is built in the background after open, queries are answered
+        # from the pages indexed so far and the hits of later pages stream in
+        self.search_index = SearchIndex()
+        self.index_job = None
+        self.indexed_page_count = 0
+        self.search_query = ""
+        # pages left to search for a substring or regex, in batches, and the jobs in
+        # flight, whose hits are shown in page order as they finish; only the stored
+        # text of indexed pages is searched, later pages are queued once indexed
+        self.search_pattern = ""
+        self.search_literal_list = []
+        self.search_batch_list = []
+        self.search_job_list = []
+        self.finished_search_job_set = set()
+        self.searched_page_count = 0
+        self.candidate_page_count = 0
+        self.failed_search_page_count = 0
 
         self.zoom_level = 100
         self.MIN_ZOOM = 50
-        self.MAX_ZOOM = 200
+        self.MAX_ZOOM = 1600
+        self.MAX_PAGE_ZOOM = 200
+        self.MAX_PAGE_PIXELS = 4096 * 4096
+        self.DRAFT_SCALE = 0.5
+        self.DRAFT_SCROLL_SPEED = 2000
+        self.PRELOAD_PAGES = 2
+        self.PREFETCH_SECONDS = 0.5
+        self.MAX_PREFETCH_PAGES = 20
+        self.TILE_SIZE = 512
+        self.PAGE_BATCH_SIZE = 200
+        self.TEXT_BATCH_SIZE = 10
+        self.CONTENT_BATCH_SIZE = 5
+        self.INDEX_BATCH_SIZE = 50
+        self.SEARCH_BATCH_SIZE = 100
+
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.setInterval(0)
+        self.render_timer.timeout.connect(self.render_visible_pages)
+
+        # the pages the text view waits for are collected while it fills its window
+        self.content_timer = QTimer(self)
+        self.content_timer.setSingleShot(True)
+        self.content_timer.setInterval(0)
+        self.content_timer.timeout.connect(self.extract_content_batch)
+
+        self.page_batch_timer = QTimer(self)
+        self.page_batch_timer.setSingleShot(True)
+        self.page_batch_timer.setInterval(0)
+        self.page_batch_timer.timeout.connect(self.add_page_batch)
+
+        self.scroll_stop_timer = QTimer(self)
+        self.scroll_stop_timer.setSingleShot(True)
+        self.scroll_stop_timer.setInterval(300)
+        self.scroll_stop_timer.timeout.connect(self.on_scroll_stopped)
+
+        # a burst of zoom steps is previewed by scaling the current images, and the
+        # pages are rendered once at the final zoom level when the steps stop
+        self.zoom_render_timer = QTimer(self)
+        self.zoom_render_timer.setSingleShot(True)
+        self.zoom_render_timer.setInterval(150)
+        self.zoom_render_timer.timeout.connect(self.render_visible_pages)
 
         self.main_layout = QVBoxLayout(self)
         self.main_layout.setAlignment(Qt.AlignCenter)
         self.main_layout.setContentsMargins(10, 10, 10, 10)
         self.main_layout.setSpacing(12)
 
-        self.vertical_page_layout = QVBoxLayout()
-        self.vertical_page_layout.setAlignment(Qt.AlignCenter)
-
         self.init_widget()
         self.init_layout()
-        self.render_page()
+        self.init_pages()
 
         self.zoom_changed.connect(self.update_zoom_buttons)
+        renderService.page_rendered.connect(self.on_page_rendered)
+        renderService.text_extracted.connect(self.on_text_extracted)
+        renderService.content_extracted.connect(self.on_content_extracted)
+        renderService.words_indexed.connect(self.on_words_indexed)
+        renderService.text_searched.connect(self.on_text_searched)
+        cfg.textPageCacheSize.valueChanged.connect(self.on_text_page_cache_size_changed)
 
     def init_widget(self):
         """initialize widget"""
@@ -71,6 +176,9 @@ class ViewArea(CardWidget):
         )
         self.tool_bar.content_button.clicked.connect(self.change_toc_view_visibility)
         self.tool_bar.more_button.clicked.connect(self.change_text_view_visibility)
+        self.tool_bar.search_button.clicked.connect(
+            self.change_search_view_visibility
+        )
         self.tool_bar.theme_button.clicked.connect(lambda: toggleTheme(True))
         self.tool_bar.info_button.clicked.connect(self.show_info)
         self.tool_bar.prev_page.clicked.connect(self.prev_page)
@@ -81,98 +189,718 @@ class ViewArea(CardWidget):
         self.tool_bar.fit_page.clicked.connect(self.fit_page)
         self.tool_bar.rotate_page.clicked.connect(self.rotate_page)
 
-        self.vertical_scroll_area = ScrollArea(self)
-        self.vertical_scroll_area.setStyleSheet(
-            "border: none; background-color: transparent"
+        self.page_canvas = PageCanvas(self)
+        self.page_canvas.horizontalScrollBar().valueChanged.connect(
+            self.render_timer.start
         )
-        self.vertical_scroll_area.setWidgetResizable(True)
-        self.vertical_scroll_area.horizontalScrollBar().setValue(1900)
-        self.vertical_scroll_area.verticalScrollBar().valueChanged.connect(
-            self.scroll_page
+        self.page_canvas.verticalScrollBar().valueChanged.connect(
+            self.update_scroll_velocity
+        )
+        self.page_canvas.verticalScrollBar().valueChanged.connect(self.scroll_page)
+        self.page_canvas.zoom_requested.connect(
+            lambda delta, pos: self.zoom_page(round(delta / 12), pos)
         )
-
-        self.vertical_scroll_widget = QWidget()
 
         self.toc_view = TocView(self.document, self)
         self.toc_view.close_button.clicked.connect(self.change_toc_view_visibility)
         self.toc_view.content_clicked.connect(self.go_to_page)
+        self.toc_view.content_hovered.connect(self.prefetch_page)
         self.toc_view.setVisible(self.show_toc_view)
         self.toc_view.move(10, 74)
 
         self.text_view = TextView(self)
         self.text_view.close_button.clicked.connect(self.change_text_view_visibility)
+        self.text_view.text_area.text_provider = self.get_page_text
+        self.text_view.text_area.page_changed.connect(self.go_to_page)
+        self.text_view.html_area.text_provider = self.get_page_html
+        self.text_view.html_area.document().image_provider = self.get_page_image
+        self.text_view.html_area.page_changed.connect(self.go_to_page)
         self.text_view.setVisible(self.show_text_view)
 
+        self.search_view = SearchView(self)
+        self.search_view.close_button.clicked.connect(
+            self.change_search_view_visibility
+        )
+        self.search_view.query_changed.connect(self.search)
+        self.search_view.hit_clicked.connect(self.show_hit)
+        self.search_view.snippet_provider = self.get_hit_snippet
+        self.search_view.set_progress(0, self.page_count)
+        self.search_view.setVisible(self.show_search_view)
+
     def init_layout(self):
         """initialize layout"""
         self.main_layout.addWidget(self.tool_bar)
-        self.vertical_scroll_widget.setLayout(self.vertical_page_layout)
-        self.vertical_scroll_area.setWidget(self.vertical_scroll_widget)
-        self.main_layout.addWidget(self.vertical_scroll_area)
+        self.main_layout.addWidget(self.page_canvas)
 
-    def render_page(self):
-        """render page"""
-        for i in range(self.page_count):
-            page = self.document.load_page(i)
-            self.text += page.get_text("text")
-            self.html += page.get_text("html")
-            page_pixmap = get_pixmap(page, matrix=Identity, clip=True)
-            if page_pixmap.alpha:
-                image_format = QImage.Format.Format_RGBA8888
+    def init_pages(self):
+        """initialize page placeholders"""
+        # the first batch is added at once so the first page renders right away,
+        # the remaining pages, thumbnails and text stream in from the event loop
+        self.add_page_batch()
+        self.update_zoom_buttons()
+
+    def add_page_batch(self):
+        """add the placeholders of the next batch of pages"""
+        start = len(self.page_size_list)
+        end = min(start + self.PAGE_BATCH_SIZE, self.page_count)
+        size_list = get_page_size_list(self.document, start, end)
+        self.page_size_list += size_list
+        self.page_canvas.add_pages(size_list)
+
+        if end < self.page_count:
+            self.page_batch_timer.start()
+        else:
+            self.toc_view.init_sub_interface(
+                self.file_identity, self.page_size_list
+            )
+            self.index_page_batch()
+
+        # restarting the timer on every batch would keep postponing the first render
+        if start == 0 or end == self.page_count:
+            self.render_timer.start()
+
+    def add_pages_until(self, page_count):
+        """add page placeholders synchronously until `page_count` pages exist"""
+        while len(self.page_size_list) < page_count:
+            self.page_batch_timer.stop()
+            self.add_page_batch()
+
+    def extract_text_batch(self):
+        """Extract the text of the next batch of pages in a worker process."""
+        start = self.extracted_page_count
+        if self.text_job is not None or start >= self.page_count:
+            return
+
+        # a single batch is queued at a time, so rendering is never stuck behind text
+        self.text_job = TextJob(
+            self,
+            self.path,
+            self.document.password,
+            start,
+            min(start + self.TEXT_BATCH_SIZE, self.page_count),
+        )
+        renderService.extract_text(self.text_job)
+
+    def on_text_extracted(self, job):
+        """on text extracted"""
+        if job.owner is not self or job is not self.text_job:
+            return
+
+        self.text_job = None
+        # the pages of a failed batch may all hold text, their content is extracted
+        # page by page, so the pages after them are not held up
+        flag_list = job.flag_list or [(True, False)] * (job.end - job.start)
+        self.text_view.append_pages(flag_list)
+        self.extracted_page_count = job.end
+        if job.end < self.page_count:
+            self.extract_text_batch()
+        else:
+            self.text_view.finish_pages()
+
+    def extract_content_batch(self):
+        """Extract the text or html of the pages the text view waits for in workers."""
+        for is_html, area in (
+            (False, self.text_view.text_area),
+            (True, self.text_view.html_area),
+        ):
+            if self.content_job_dict[is_html] is not None:
+                continue
+
+            # pages that left the window of the area are no longer needed
+            page_set = {
+                page_index
+                for page_index in self.missing_page_dict[is_html]
+                if area.first_page <= page_index < area.last_page
+            }
+            self.missing_page_dict[is_html] = page_set
+            if not page_set:
+                continue
+
+            job = ContentJob(
+                self,
+                self.path,
+                self.document.password,
+                sorted(page_set)[: self.CONTENT_BATCH_SIZE],
+                is_html,
+                is_html and cfg.get(cfg.showHtmlImages),
+            )
+            self.content_job_dict[is_html] = job
+            renderService.extract_content(job)
+
+    def on_content_extracted(self, job):
+        """on content extracted"""
+        if job.owner is not self or job is not self.content_job_dict[job.is_html]:
+            return
+
+        self.content_job_dict[job.is_html] = None
+        area = self.text_view.html_area if job.is_html else self.text_view.text_area
+        # the pages of a failed job stay empty rather than being asked for again
+        content_list = job.content_list or [""] * len(job.page_list)
+        for page_index, content in zip(job.page_list, content_list):
+            self.page_content_dict[(page_index, job.is_html, job.show_images)] = content
+            self.missing_page_dict[job.is_html].discard(page_index)
+            area.update_page(page_index)
+        self.extract_content_batch()
+
+    def index_page_batch(self):
+        """Index the words of the next batch of pages in a worker process."""
+        start = self.indexed_page_count
+        if self.index_job is not None or start >= self.page_count:
+            return
+
+        self.index_job = IndexJob(
+            self,
+            self.path,
+            self.document.password,
+            start,
+            min(start + self.INDEX_BATCH_SIZE, self.page_count),
+        )
+        renderService.index_words(self.index_job)
+
+    def on_words_indexed(self, job):
+        """on words indexed"""
+        if job.owner is not self or job is not self.index_job:
+            return
+
+        self.index_job = None
+        if job.posting_dict is None:
+            # the pages of a failed batch are left out of the index, their text is
+            # extracted for the text view when shown, and indexing goes on
+            job.posting_dict = job.trigram_dict = {}
+            job.text_list = [None] * (job.end - job.start)
+
+        if self.search_query and self.search_view.mode == "words":
+            batch_index = SearchIndex()
+            batch_index.add_postings(job.posting_dict)
+            self.search_view.append_hits(batch_index.search(self.search_query))
+
+        self.search_index.add_postings(job.posting_dict)
+        self.search_index.add_trigrams(job.trigram_dict, job.start, job.end)
+        self.search_index.add_texts(job.text_list)
+        self.indexed_page_count = job.end
+        self.search_view.set_progress(self.indexed_page_count, self.page_count)
+        if self.search_pattern:
+            page_list = self.search_index.get_candidate_pages(
+                self.search_literal_list, job.end
+            )
+            self.queue_text_search(page_list[bisect_left(page_list, job.start) :])
+        self.index_page_batch()
+
+    def search(self, query):
+        """search the indexed pages, hits of the remaining pages are appended later"""
+        self.search_query = query.strip()
+        self.cancel_text_search()
+        self.page_canvas.set_highlights({})
+        if not self.search_query or self.search_view.mode == "words":
+            self.search_view.set_hits(
+                self.search_index.search(self.search_query) if self.search_query else []
+            )
+            return
+
+        pattern = self.search_query
+        if self.search_view.mode == "text":
+            pattern = re.escape(pattern)
+        try:
+            literal_list = get_regex_literals(pattern)
+        except re.error as e:
+            self.search_view.set_hits([], f"Invalid regular expression: {e}")
+            return
+
+        self.search_pattern = pattern
+        self.search_literal_list = literal_list
+        self.search_view.set_hits([])
+        self.queue_text_search(
+            self.search_index.get_candidate_pages(literal_list, self.indexed_page_count)
+        )
+
+    def queue_text_search(self, page_list):
+        """queue indexed pages the trigram filter kept for the text search"""
+        self.search_batch_list += [
+            page_list[i : i + self.SEARCH_BATCH_SIZE]
+            for i in range(0, len(page_list), self.SEARCH_BATCH_SIZE)
+        ]
+        self.candidate_page_count += len(page_list)
+        self.search_view.set_search_progress(
+            self.searched_page_count,
+            self.candidate_page_count,
+            self.failed_search_page_count,
+        )
+        self.search_text_batch()
+
+    def search_text_batch(self):
+        """keep a text search batch in flight in every worker"""
+        while self.search_batch_list and (
+            len(self.search_job_list) < renderService.max_workers
+        ):
+            page_list = self.search_batch_list.pop(0)
+            job = SearchJob(
+                self,
+                page_list,
+                [self.search_index.text_list[i] or "" for i in page_list],
+                self.search_pattern,
+                self.search_view.MAX_HITS,
+            )
+            self.search_job_list.append(job)
+            renderService.search_text(job)
+
+    def on_text_searched(self, job):
+        """on text searched"""
+        if job.owner is not self or job not in self.search_job_list:
+            return
+
+        self.finished_search_job_set.add(job)
+        while self.search_job_list and (
+            self.search_job_list[0] in self.finished_search_job_set
+        ):
+            job = self.search_job_list.pop(0)
+            self.finished_search_job_set.discard(job)
+            self.searched_page_count += len(job.page_list)
+            if job.hit_list is None:
+                # a failed batch is reported rather than searched again
+                self.failed_search_page_count += len(job.page_list)
             else:
-                image_format = QImage.Format.Format_RGB888
-            page_image = QImage(
-                page_pixmap.samples,
-                page_pixmap.w,
-                page_pixmap.h,
-                page_pixmap.stride,
-                image_format,
+                self.search_view.append_hits([TextHit(*hit) for hit in job.hit_list])
+
+        if len(self.search_view.hit_list) >= self.search_view.MAX_HITS:
+            self.cancel_text_search()
+        else:
+            self.search_text_batch()
+        self.search_view.set_search_progress(
+            self.searched_page_count,
+            self.candidate_page_count,
+            self.failed_search_page_count,
+        )
+
+    def cancel_text_search(self):
+        """stop the text search in progress"""
+        for job in self.search_job_list:
+            renderService.cancel(job)
+        self.search_pattern = ""
+        self.search_literal_list = []
+        self.search_batch_list = []
+        self.search_job_list = []
+        self.finished_search_job_set.clear()
+        self.searched_page_count = self.candidate_page_count = 0
+        self.failed_search_page_count = 0
+
+    def get_hit_snippet(self, hit, context_words=5):
+        """get the words around a search hit"""
+        if isinstance(hit, TextHit):
+            return hit.snippet
+
+        word_list = get_words(self.search_index.text_list[hit.page_index] or "")
+        start = max(hit.first_word - context_words, 0)
+        end = hit.last_word + 1 + context_words
+        snippet = " ".join(word_list[start:end])
+        if start > 0:
+            snippet = "… " + snippet
+        if end < len(word_list):
+            snippet += " …"
+        return snippet
+
+    def show_hit(self, hit):
+        """scroll to a search hit and highlight it"""
+        text_page = self.text_page_cache.get(hit.page_index)
+        if isinstance(hit, TextHit):
+            # every occurrence of the matched text on the page is highlighted
+            rect_list = [
+                QRectF(x0, y0, x1 - x0, y1 - y0)
+                for x0, y0, x1, y1 in (quad.rect for quad in text_page.search(hit.text))
+            ]
+            visible_rect_list = rect_list[hit.occurrence : hit.occurrence + 1]
+        else:
+            word_list = text_page.extractWORDS()
+            rect_list = visible_rect_list = [
+                QRectF(x0, y0, x1 - x0, y1 - y0)
+                for x0, y0, x1, y1, *_ in word_list[hit.first_word : hit.last_word + 1]
+            ]
+        self.add_pages_until(hit.page_index + 1)
+        self.page_canvas.set_highlights({hit.page_index: rect_list})
+        if not visible_rect_list:
+            self.go_to_page(hit.page_index + 1)
+            return
+
+        rect = visible_rect_list[0]
+        for other in visible_rect_list[1:]:
+            rect = rect.united(other)
+        self.page_canvas.ensure_visible(hit.page_index, rect)
+
+    def get_page_content(self, page_index, is_html):
+        """Get the text or html of a page, None until a worker extracted it."""
+        if not is_html and page_index < len(self.search_index.text_list):
+            text = self.search_index.text_list[page_index]
+            if text is not None:
+                return text
+
+        show_images = is_html and cfg.get(cfg.showHtmlImages)
+        content = self.page_content_dict.get((page_index, is_html, show_images))
+        if content is None:
+            self.missing_page_dict[is_html].add(page_index)
+            self.content_timer.start()
+        return content
+
+    def get_page_text(self, page_index):
+        """get the text of a page for the text view"""
+        return self.get_page_content(page_index, False)
+
+    def get_page_html(self, page_index):
+        """get the html of a page for the text view"""
+        return self.get_page_content(page_index, True)
+
+    def get_page_image(self, xref):
+        """get an image referenced by the html of a page"""
+        return read_document_image(self.document, xref)
+
+    def get_cache_key(self, page_index, zoom, tile=None):
+        """get the page cache key of a page or of one of its tiles"""
+        return PageCacheKey(
+            self.file_identity,
+            page_index,
+            zoom,
+            0,
+            self.device_pixel_ratio,
+            tuple(tile.getRect()) if tile is not None else None,
+        )
+
+    def get_page_zoom(self, page_index):
+        """
+        Get the zoom level a whole page is rendered at, tiles add the detail above it.
+
+        Large pages are rendered below `MAX_PAGE_ZOOM`, so that no whole page image
+        holds more than `MAX_PAGE_PIXELS` device pixels.
+        """
+        width, height = self.page_size_list[page_index]
+        pixel_zoom = math.sqrt(self.MAX_PAGE_PIXELS / max(width * height, 1))
+        # rounded down, so the cache keys of a page stay stable
+        pixel_zoom = math.floor(pixel_zoom / self.device_pixel_ratio * 100) / 100
+        return min(self.zoom_level / 100, self.MAX_PAGE_ZOOM / 100, pixel_zoom)
+
+    def has_tiles(self, page_index):
+        """whether the current zoom level is above the zoom level of the whole page"""
+        return self.zoom_level / 100 > self.get_page_zoom(page_index)
+
+    def is_draft_mode(self):
+        """whether the view scrolls too fast for pages to be rendered at full quality"""
+        return (
+            self.scroll_stop_timer.isActive()
+            and abs(self.scroll_velocity) > self.DRAFT_SCROLL_SPEED
+        )
+
+    def load_page(self, page_index, draft=False):
+        """Show a page from the page cache, rendering it on a cache miss."""
+        page_zoom = self.get_page_zoom(page_index)
+        pixmap = pageCache.get(self.get_cache_key(page_index, page_zoom))
+        if pixmap is None and page_index in self.prefetch_job_dict:
+            self.pending_job_dict[page_index] = self.prefetch_job_dict.pop(page_index)
+            return
+        if pixmap is None:
+            self.render_page(page_index, draft)
+            return
+
+        self.loaded_page_dict[page_index] = (page_zoom, self.device_pixel_ratio, False)
+        self.page_canvas.set_pixmap(page_index, pixmap)
+        self.on_page_shown()
+
+    def create_render_job(self, page_index, draft=False):
+        """create the render job of a whole page at the page zoom level"""
+        page_zoom = self.get_page_zoom(page_index)
+        if draft:
+            # drafts are never cached, they are replaced as soon as the view is idle
+            return RenderJob(
+                self,
+                self.path,
+                self.document.password,
+                page_index,
+                page_zoom * self.DRAFT_SCALE,
+                generation=self.render_generation,
+                draft=True,
+                device_pixel_ratio=self.device_pixel_ratio,
             )
-            pixmap = QPixmap()
-            pixmap.convertFromImage(page_image)
 
-            page_widget = PixmapLabel(self)
-            page_widget.setAlignment(Qt.AlignCenter)
-            page_widget.setPixmap(pixmap)
-            self.vertical_page_layout.addWidget(page_widget)
-            self.page_widget_list.append(page_widget)
-            self.page_pixmap_list.append(pixmap)
-            self.page_pixmap_dict[page_widget] = pixmap
+        return RenderJob(
+            self,
+            self.path,
+            self.document.password,
+            page_index,
+            page_zoom,
+            cache_path=diskCache.get_file_path(
+                self.get_cache_key(page_index, page_zoom)
+            ),
+            generation=self.render_generation,
+            device_pixel_ratio=self.device_pixel_ratio,
+        )
 
-            self.apply_zoom(page_widget)
+    def render_page(self, page_index, draft=False):
+        """render page"""
+        if page_index in self.pending_job_dict:
+            renderService.cancel(self.pending_job_dict.pop(page_index))
 
-            _shadow = QGraphicsDropShadowEffect()
-            _shadow.setBlurRadius(15)
-            _shadow.setColor(QColor(10, 10, 10, 100))
-            _shadow.setOffset(0, 0)
-            page_widget.setGraphicsEffect(_shadow)
+        job = self.create_render_job(page_index, draft)
+        self.pending_job_dict[page_index] = job
+        renderService.render(job)
 
-            del page_pixmap
+    def prefetch_page(self, page_count):
+        """Render a page into the page cache ahead of a click on its entry or thumbnail."""
+        page_index = page_count - 1
+        if (
+            page_index >= len(self.page_size_list)
+            or page_index in self.loaded_page_dict
+            or page_index in self.pending_job_dict
+            or page_index in self.prefetch_job_dict
+            or pageCache.get(
+                self.get_cache_key(page_index, self.get_page_zoom(page_index))
+            )
+            is not None
+        ):
+            return
 
-        self.toc_view.init_sub_interface(self.page_pixmap_list)
-        self.text_view.init_sub_interface(self.text, self.html)
+        # only the page under the cursor is worth rendering ahead
+        self.cancel_prefetch()
+        job = self.create_render_job(page_index)
+        self.prefetch_job_dict[page_index] = job
+        renderService.render(job)
 
-        self.update_zoom_buttons()
+    def cancel_prefetch(self):
+        """cancel the pages rendered ahead of a click"""
+        for job in self.prefetch_job_dict.values():
+            renderService.cancel(job)
+        self.prefetch_job_dict.clear()
 
-    def apply_zoom(self, page_widget):
-        """Apply zoom to a single page widget based on the current zoom level."""
-        pixmap = self.page_pixmap_dict[page_widget]
-        matrix = QTransform()
-        matrix.rotate(self.page_rotation)
-
-        scaled_pixmap = pixmap.scaled(
-            int(pixmap.width() * self.zoom_level / 100),
-            int(pixmap.height() * self.zoom_level / 100),
-            Qt.KeepAspectRatio,
-            Qt.SmoothTransformation,
+    def render_tiles(self, page_index):
+        """Render the tiles of a page intersecting the viewport at the current zoom."""
+        page_geometry = self.page_canvas.page_geometry
+        viewport_rect = self.page_canvas.get_viewport_rect()
+        visible_rect = self.page_canvas.map_to_page(
+            page_index,
+            viewport_rect.intersected(page_geometry.get_page_rect(page_index)),
         )
-        rotated_pixmap = scaled_pixmap.transformed(
-            matrix, Qt.TransformationMode.SmoothTransformation
+
+        zoom = self.zoom_level / 100
+        page_size = page_geometry.get_page_size(page_index)
+        page_width = page_size.width()
+        page_height = page_size.height()
+        tile_size = self.TILE_SIZE
+        pos_set = set()
+
+        for x in range(
+            int(visible_rect.left() // tile_size) * tile_size,
+            math.ceil(min(visible_rect.right(), page_width)),
+            tile_size,
+        ):
+            for y in range(
+                int(visible_rect.top() // tile_size) * tile_size,
+                math.ceil(min(visible_rect.bottom(), page_height)),
+                tile_size,
+            ):
+                pos_set.add((x, y))
+                key = (page_index, x, y)
+                if (
+                    self.page_canvas.has_tile(page_index, (x, y))
+                    or key in self.pending_tile_dict
+                ):
+                    continue
+
+                tile = QRectF(
+                    x,
+                    y,
+                    min(tile_size, page_width - x),
+                    min(tile_size, page_height - y),
+                )
+                cache_key = self.get_cache_key(page_index, zoom, tile)
+                pixmap = pageCache.get(cache_key)
+                if pixmap is not None:
+                    self.page_canvas.set_tile(page_index, (x, y), pixmap)
+                    continue
+
+                job = RenderJob(
+                    self,
+                    self.path,
+                    self.document.password,
+                    page_index,
+                    zoom,
+                    tile,
+                    diskCache.get_file_path(cache_key),
+                    self.render_generation,
+                    device_pixel_ratio=self.device_pixel_ratio,
+                )
+                self.pending_tile_dict[key] = job
+                renderService.render(job)
+
+        self.page_canvas.retain_tiles(page_index, pos_set)
+        self.cancel_tiles(page_index, pos_set)
+
+    def cancel_tiles(self, page_index, pos_set=()):
+        """Cancel the pending tiles of a page, except those at the given positions."""
+        for key in list(self.pending_tile_dict):
+            if key[0] == page_index and key[1:] not in pos_set:
+                renderService.cancel(self.pending_tile_dict.pop(key))
+
+    def on_page_rendered(self, job):
+        """on page rendered"""
+        if job.owner is not self:
+            return
+
+        if job.tile is not None:
+            self.on_tile_rendered(job)
+            return
+
+        if self.prefetch_job_dict.get(job.page_index) is job:
+            del self.prefetch_job_dict[job.page_index]
+            if not job.image.isNull():
+                pageCache.put(
+                    self.get_cache_key(job.page_index, job.zoom),
+                    QPixmap.fromImage(job.image),
+                )
+            return
+
+        if self.pending_job_dict.get(job.page_index) is not job:
+            return
+
+        del self.pending_job_dict[job.page_index]
+        if job.image.isNull():
+            return
+
+        pixmap = QPixmap.fromImage(job.image)
+        if not job.draft:
+            pageCache.put(self.get_cache_key(job.page_index, job.zoom), pixmap)
+        self.loaded_page_dict[job.page_index] = (
+            job.zoom,
+            job.device_pixel_ratio,
+            job.draft,
         )
-        page_widget.setPixmap(rotated_pixmap)
+        self.page_canvas.set_pixmap(job.page_index, pixmap)
+        self.on_page_shown()
+
+    def on_page_shown(self):
+        """record the time to first page once the first page is shown"""
+        if self.time_to_first_page is None:
+            self.time_to_first_page = (time.perf_counter() - self.open_time) * 1000
+
+    def on_tile_rendered(self, job):
+        """on tile rendered"""
+        pos = (int(job.tile.x()), int(job.tile.y()))
+        key = (job.page_index, *pos)
+        if self.pending_tile_dict.get(key) is not job:
+            return
+
+        del self.pending_tile_dict[key]
+        # the zoom or rotation changed since the tile was queued
+        if job.generation != self.render_generation or job.image.isNull():
+            return
+
+        pixmap = QPixmap.fromImage(job.image)
+        pageCache.put(self.get_cache_key(job.page_index, job.zoom, job.tile), pixmap)
+        self.page_canvas.set_tile(job.page_index, pos, pixmap)
+
+    def release_page(self, page_index):
+        """release page"""
+        if page_index in self.pending_job_dict:
+            renderService.cancel(self.pending_job_dict.pop(page_index))
+        self.cancel_tiles(page_index)
+        self.page_canvas.retain_tiles(page_index, set())
+        if page_index in self.loaded_page_dict:
+            del self.loaded_page_dict[page_index]
+            self.page_canvas.set_pixmap(page_index, QPixmap())
+
+    def render_visible_pages(self):
+        """Render pages in or near the viewport and release the others."""
+        if (
+            not self.isVisible()
+            or not self.page_count
+            or self.zoom_render_timer.isActive()
+        ):
+            return
+
+        visible_first, visible_last = self.page_canvas.get_visible_page_range()
+        prefetch_pages = self.get_prefetch_page_count(visible_first, visible_last)
+        first = visible_first - self.PRELOAD_PAGES
+        last = visible_last + self.PRELOAD_PAGES
+        if self.scroll_velocity < 0:
+            first -= prefetch_pages
+        else:
+            last += prefetch_pages
+        first = max(first, 0)
+        last = min(last, len(self.page_size_list) - 1)
+
+        for page_index in list(self.loaded_page_dict) + list(self.pending_job_dict):
+            if page_index < first or page_index > last:
+                self.release_page(page_index)
+
+        # jobs run in submission order, so queue the pages closest to the viewport first
+        device_pixel_ratio = self.device_pixel_ratio
+        draft = self.is_draft_mode()
+        for page_index in sorted(
+            range(first, last + 1),
+            key=lambda i: max(visible_first - i, i - visible_last, 0),
+        ):
+            job = self.pending_job_dict.get(page_index)
+            if job is not None and (draft or not job.draft):
+                continue
+            page_zoom = self.get_page_zoom(page_index)
+            loaded_state = self.loaded_page_dict.get(page_index)
+            if loaded_state == (page_zoom, device_pixel_ratio, False):
+                continue
+
+            # drafts are upgraded once the view is idle, while the image at a previous
+            # zoom level is only replaced when its page is scrolled into view, both are
+            # scaled as a preview until then
+            visible = visible_first <= page_index <= visible_last
+            draft_state = (page_zoom * self.DRAFT_SCALE, device_pixel_ratio, True)
+            is_draft = loaded_state == draft_state
+            if loaded_state is not None and (draft or not (visible or is_draft)):
+                continue
+            self.load_page(page_index, draft)
 
-    def zoom_page(self, value):
-        """Zoom page with limitations."""
+        for page_index in range(first, last + 1):
+            visible = visible_first <= page_index <= visible_last
+            if draft and visible:
+                continue
+            if self.has_tiles(page_index) and visible:
+                self.render_tiles(page_index)
+            else:
+                self.page_canvas.retain_tiles(page_index, set())
+                self.cancel_tiles(page_index)
+
+    def get_prefetch_page_count(self, visible_first, visible_last):
+        """Get how many pages to render ahead, within half of the page cache budget."""
+        page_geometry = self.page_canvas.page_geometry
+        page_height = page_geometry.get_page_rect(visible_first).height()
+        page_height += page_geometry.spacing
+        page_count = int(abs(self.scroll_velocity) * self.PREFETCH_SECONDS / page_height)
+
+        width, height = self.page_size_list[visible_first]
+        scale = self.get_page_zoom(visible_first) * self.device_pixel_ratio
+        page_bytes = max(int(width * height * scale**2 * 4), 1)
+        budget_count = pageCache.max_bytes // 2 // page_bytes
+        budget_count -= visible_last - visible_first + 1 + 2 * self.PRELOAD_PAGES
+        return max(min(page_count, self.MAX_PREFETCH_PAGES, budget_count), 0)
+
+    def update_scroll_velocity(self, value):
+        """Track the scroll velocity in pixels per second, positive when scrolling down."""
+        now = time.perf_counter()
+        delta = value - self.last_scroll_value
+        elapsed = max(now - self.last_scroll_time, 0.001)
+        self.last_scroll_value = value
+        self.last_scroll_time = now
+        self.scroll_stop_timer.start()
+
+        if abs(delta) > 3 * self.page_canvas.viewport().height():
+            # a jump, e.g. go to page, says nothing about where the user heads next
+            self.scroll_velocity = 0.0
+        elif delta * self.scroll_velocity < 0:
+            # the direction changed, so the pages rendered ahead are released and
+            # their pending jobs cancelled on the next render
+            self.scroll_velocity = 0.0
+        else:
+            self.scroll_velocity = 0.5 * self.scroll_velocity + 0.5 * delta / elapsed
+
+    def on_scroll_stopped(self):
+        """on scroll stopped"""
+        self.scroll_velocity = 0.0
+        self.render_timer.start()
+
+    def zoom_page(self, value, anchor=None):
+        """Zoom page with limitations, keeping the point under `anchor` in place."""
         new_zoom = self.zoom_level + value
         if new_zoom < self.MIN_ZOOM:
             new_zoom = self.MIN_ZOOM
@@ -192,16 +920,57 @@ class ViewArea(CardWidget):
         if new_zoom != self.zoom_level:
             self.zoom_level = new_zoom
             self.zoom_changed.emit(self.zoom_level)
-            self.update_zoom()
+            self.update_zoom(anchor)
         else:
             pass
 
-    def update_zoom(self):
-        """Update all pages with the current zoom level."""
-        for page_widget in self.page_widget_list:
-            self.apply_zoom(page_widget)
+    def update_zoom(self, anchor=None):
+        """Lay the pages out at the current zoom level, rendering them once it settles."""
+        self.cancel_outdated_tiles()
+
+        # pages queued at another zoom level are outdated, the images shown stay as
+        # previews until the visible pages are rendered again
+        for page_index, job in list(self.pending_job_dict.items()):
+            if job.zoom != self.get_page_zoom(page_index):
+                renderService.cancel(self.pending_job_dict.pop(page_index))
+        self.cancel_prefetch()
+        self.page_canvas.set_page_transform(
+            self.zoom_level / 100, self.page_rotation, anchor
+        )
 
         self.tool_bar.page_count_line_edit.setText(str(self.current_page))
+        self.zoom_render_timer.start()
+
+    def update_device_pixel_ratio(self):
+        """Render the pages again once the window is on a screen with another scale."""
+        device_pixel_ratio = self.devicePixelRatioF()
+        if device_pixel_ratio == self.device_pixel_ratio:
+            return
+
+        # the images shown stay as previews until the pages are rendered again
+        self.device_pixel_ratio = device_pixel_ratio
+        self.cancel_outdated_tiles()
+        for job in self.pending_job_dict.values():
+            renderService.cancel(job)
+        self.pending_job_dict.clear()
+        self.cancel_prefetch()
+        self.page_canvas.clear_tiles()
+        self.render_timer.start()
+
+    def on_screen_changed(self, screen):
+        """on screen changed"""
+        self.update_device_pixel_ratio()
+
+    def on_text_page_cache_size_changed(self, value):
+        """on text page cache size changed"""
+        self.text_page_cache.set_max_bytes(value * 1024 * 1024)
+
+    def cancel_outdated_tiles(self):
+        """cancel the tiles queued for the previous view state"""
+        self.render_generation += 1
+        for job in self.pending_tile_dict.values():
+            renderService.cancel(job)
+        self.pending_tile_dict.clear()
 
     def update_zoom_buttons(self):
         """Update the state of zoom buttons based on the current zoom level."""
@@ -218,9 +987,9 @@ class ViewArea(CardWidget):
             self.tool_bar.fit_page.setChecked(False)
         else:
             self.is_fit_page = True
-            viewport_width = self.vertical_scroll_area.viewport().width()
-            pixmap = self.page_pixmap_list[0]
-            new_zoom = (viewport_width - 40) / pixmap.width() * 100
+            viewport_width = self.page_canvas.viewport().width()
+            page_width = self.page_size_list[0][0]
+            new_zoom = (viewport_width - 40) / page_width * 100
             self.zoom_level = int(new_zoom)
             if self.zoom_level > self.MAX_ZOOM:
                 self.zoom_level = self.MAX_ZOOM
@@ -236,52 +1005,32 @@ class ViewArea(CardWidget):
         else:
             self.page_rotation = 0
 
-        matrix = QTransform()
-        matrix.rotate(self.page_rotation)
-
-        for page in self.page_widget_list:
-            original_pixmap = self.page_pixmap_dict[page]
-            rotated_pixmap = original_pixmap.transformed(
-                matrix, Qt.SmoothTransformation
-            )
-            scaled_pixmap = rotated_pixmap.scaled(
-                int(rotated_pixmap.width() * self.zoom_level / 100),
-                int(rotated_pixmap.height() * self.zoom_level / 100),
-                Qt.KeepAspectRatio,
-                Qt.SmoothTransformation,
-            )
-            page.setPixmap(scaled_pixmap)
+        # pages are rendered unrotated and turned by the canvas, so their images, tiles
+        # and pending jobs all stay valid, only newly visible pages are rendered
+        self.page_canvas.set_page_transform(self.zoom_level / 100, self.page_rotation)
+        self.render_timer.start()
 
     def scroll_page(self):
         """scroll page"""
-        viewport_rect = self.vertical_scroll_area.viewport().rect()
+        self.render_timer.start()
+
+        viewport_rect = self.page_canvas.get_viewport_rect()
+        first, last = self.page_canvas.get_visible_page_range()
         max_visible_area = 0
 
-        for page in self.page_widget_list:
-            page_rect = self.vertical_scroll_area.viewport().mapFromGlobal(
-                page.mapToGlobal(page.rect().topLeft())
-            )
-            page_visible_rect = QRect(page_rect, page.size()).intersected(viewport_rect)
+        for page_index in range(first, last + 1):
+            page_rect = self.page_canvas.page_geometry.get_page_rect(page_index)
+            page_visible_rect = page_rect.intersected(viewport_rect)
             visible_area = page_visible_rect.width() * page_visible_rect.height()
 
             if visible_area > max_visible_area:
                 max_visible_area = visible_area
-                self.current_page = self.page_widget_list.index(page) + 1
+                self.current_page = page_index + 1
 
         if self.current_page:
             self.tool_bar.page_count_line_edit.setText(str(self.current_page))
-            self.toc_view.toc_image.set_current_page_card(self.current_page)
-            scroll_bar = self.toc_view.toc_image.scroll_area.verticalScrollBar()
-            space = self.toc_view.toc_image.page_layout.spacing()
-            total_height = int(
-                -(self.toc_view.toc_image.scroll_area.height() / 3)
-                + self.toc_view.toc_image.page_card_dict[1].height() / 3
-            )
-
-            for i in range(self.current_page - 1):
-                total_height += self.toc_view.toc_image.page_card_dict[i + 1].height()
-                total_height += space
-            scroll_bar.setValue(total_height)
+            if self.toc_view.toc_image is not None:
+                self.toc_view.toc_image.scroll_to_page_card(self.current_page)
 
     def prev_page(self):
         """prev page"""
@@ -307,14 +1056,8 @@ class ViewArea(CardWidget):
                 self.tool_bar.page_count_line_edit.setText(str(self.current_page))
 
             else:
-                scroll_bar = self.vertical_scroll_area.verticalScrollBar()
-                space = self.vertical_page_layout.spacing()
-
-                total_height = 10
-                for i in range(page_count - 1):
-                    total_height += self.page_widget_list[i].height()
-                    total_height += space
-                scroll_bar.setValue(total_height)
+                self.add_pages_until(page_count)
+                self.page_canvas.scroll_to_page(page_count - 1)
                 self.current_page = page_count
 
         except ValueError:
@@ -322,7 +1065,13 @@ class ViewArea(CardWidget):
 
     def show_info(self):
         """show info"""
-        dialog = InfoDialogBox(self.path, self.document, self)
+        dialog = InfoDialogBox(
+            self.path,
+            self.document,
+            self,
+            self.time_to_first_page,
+            pageCache.statistics(),
+        )
         dialog.exec()
 
     def change_toc_view_visibility(self):
@@ -343,13 +1092,47 @@ class ViewArea(CardWidget):
             self.show_text_view = False
             self.tool_bar.more_button.setChecked(False)
         else:
+            # both views take the right side of the page area
+            if self.show_search_view:
+                self.change_search_view_visibility()
             self.text_view.setVisible(True)
             self.show_text_view = True
+            self.text_view.scroll_to_page(self.current_page - 1)
+            self.extract_text_batch()
             self.tool_bar.more_button.setChecked(True)
 
+    def change_search_view_visibility(self):
+        """change search view visibility"""
+        if self.show_search_view:
+            self.search_view.setVisible(False)
+            self.show_search_view = False
+            self.tool_bar.search_button.setChecked(False)
+        else:
+            if self.show_text_view:
+                self.change_text_view_visibility()
+            self.search_view.setVisible(True)
+            self.show_search_view = True
+            self.search_view.search_line_edit.setFocus()
+            self.tool_bar.search_button.setChecked(True)
+
+    def showEvent(self, event):
+        """Handle the show event"""
+        super().showEvent(event)
+        window_handle = self.window().windowHandle()
+        if window_handle is not None and window_handle is not self.window_handle:
+            # bound methods are disconnected when the view area is deleted, so a screen
+            # change after its tab is closed does not reach it
+            if self.window_handle is not None:
+                self.window_handle.screenChanged.disconnect(self.on_screen_changed)
+            self.window_handle = window_handle
+            window_handle.screenChanged.connect(self.on_screen_changed)
+        self.update_device_pixel_ratio()
+        self.render_timer.start()
+
     def resizeEvent(self, event):
         """Handle the resize event"""
         super().resizeEvent(event)
+        self.render_timer.start()
 
         distance = (
             self.main_layout.getContentsMargins()[1]
@@ -373,6 +1156,18 @@ class ViewArea(CardWidget):
             self.text_view.width(), int(self.height() - distance)
         )
 
+        self.search_view.move(
+            int(
+                self.width()
+                - self.search_view.width()
+                - self.main_layout.getContentsMargins()[2]
+            ),
+            74,
+        )
+        self.search_view.setFixedSize(
+            self.search_view.width(), int(self.height() - distance)
+        )
+
     def show_tooltip(self, tooltip_type: str, title: str, content: str):
         """Show tooltip"""
         if tooltip_type == "success":
@@ -1,8 +1,9 @@
 # coding:utf-8
 import os
 import math
+import hashlib
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Tuple
 from pymupdf import Document
 
 from ..utils.text_utils import truncate_text, parse_date
@@ -60,3 +61,106 @@ def get_file_size(path: str) -> str:
     p = math.pow(1024, i)
     s = round(size_bytes / p, 2)
     return f"{s} {size_name[i]}"
+
+
+def get_file_identity(path: str, sample_size: int = 65536) -> str:
+    """
+    Computes a cheap identity of a file that changes whenever the file is replaced or modified.
+
+    Only the start, the middle and the end of the file are hashed, so the cost does not grow
+    with the size of the file.
+
+    Args:
+        path (str): The file path to identify.
+        sample_size (int): The number of bytes hashed from each sampled region of the file.
+
+    Returns:
+        str: A hexadecimal digest of the absolute path, size, modification time and the
+            sampled content of the file.
+    """
+    stat = os.stat(path)
+    file_hash = hashlib.blake2b(digest_size=16)
+    file_hash.update(
+        f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+    )
+
+    with open(path, "rb") as f:
+        for offset in (
+            0,
+            max(stat.st_size // 2 - sample_size // 2, 0),
+            max(stat.st_size - sample_size, 0),
+        ):
+            f.seek(offset)
+            file_hash.update(f.read(sample_size))
+
+    return file_hash.hexdigest()
+
+
+def scan_folders(
+    folder_list: List[str], suffix_tuple: Tuple[str, ...]
+) -> Dict[str, Tuple[int, float]]:
+    """
+    Walks folders for the files with one of the given suffixes. Runs inside a render
+    worker process.
+
+    Args:
+        folder_list (List[str]): The folders to walk, including their subfolders.
+        suffix_tuple (Tuple[str, ...]): The lowercase suffixes of the files to collect.
+
+    Returns:
+        Dict[str, Tuple[int, float]]: The size and modification time of each file found,
+            by path. Files that cannot be read are left out.
+    """
+    file_dict = {}
+    for folder in folder_list:
+        for root, _, file_name_list in os.walk(folder):
+            for file_name in file_name_list:
+                if not file_name.lower().endswith(suffix_tuple):
+                    continue
+
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                file_dict[path] = (stat.st_size, stat.st_mtime)
+    return file_dict
+
+
+def trim_folder(folder: str, max_bytes: int) -> int:
+    """
+    Deletes the least recently modified files of a folder until it fits a size cap.
+    Runs inside a reader thread of the render service.
+
+    Args:
+        folder (str): The folder to trim, its subfolders are left alone.
+        max_bytes (int): The number of bytes the files of the folder may take.
+
+    Returns:
+        int: The number of bytes the files of the folder take after the trim. Files that
+            cannot be removed, such as mapped files on Windows, are kept.
+    """
+    if not os.path.isdir(folder):
+        return 0
+
+    entry_list = []
+    used_bytes = 0
+    for entry in os.scandir(folder):
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        entry_list.append((stat.st_mtime, stat.st_size, entry.path))
+        used_bytes += stat.st_size
+
+    entry_list.sort()
+    for _, size, path in entry_list:
+        if used_bytes <= max_bytes:
+            break
+
+        try:
+            os.remove(path)
+            used_bytes -= size
+        except OSError:
+            pass
+    return used_bytes
@@ -0,0 +1,414 @@
+# coding:utf-8
+import os
+import sys
+import mmap
+import struct
+
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from PyQt5.QtGui import QImage
+from pymupdf import TOOLS, Document, DisplayList, Page, Pixmap, csRGB, mupdf
+
+# documents opened by the current worker process, most recently used last
+_document_dict = OrderedDict()
+MAX_OPEN_DOCUMENTS = 8
+
+# (display list, estimated size in bytes) of the pages rendered by the current worker
+# process, most recently used last, so a page is only interpreted once for all its zoom
+# levels and tiles
+_display_list_dict = OrderedDict()
+_display_list_bytes = 0
+MAX_DISPLAY_LIST_BYTES = 128 * 1024 * 1024
+# estimated size of a display list besides the streams it is built from, and of the
+# display list of a page that is not stored in PDF streams
+DISPLAY_LIST_OVERHEAD = 4096
+DEFAULT_DISPLAY_LIST_BYTES = 1024 * 1024
+
+# header of the image files written to the disk cache
+IMAGE_FILE_MAGIC = b"DDP2"
+IMAGE_FILE_HEADER = struct.Struct("<4sIIII")
+
+# pages are rasterized straight into the byte order of the native 32-bit format of Qt,
+# which is B, G, R, X on little endian machines
+if sys.byteorder == "little":
+    NATIVE_COLORSPACE = mupdf.FzColorspace.Fixed_BGR
+    NATIVE_IMAGE_FORMAT = QImage.Format.Format_RGB32
+else:
+    NATIVE_COLORSPACE = mupdf.FzColorspace.Fixed_RGB
+    NATIVE_IMAGE_FORMAT = QImage.Format.Format_RGBX8888
+
+# antialiasing levels in bits, drafts trade smooth edges for speed while scrolling
+FULL_AA_LEVEL = 8
+DRAFT_AA_LEVEL = 2
+
+
+def get_page_size_list(
+    document: Document, start: int = 0, end: Optional[int] = None
+) -> List[Tuple[float, float]]:
+    """
+    Collects the size of a range of pages of a document without rasterizing any of them.
+
+    Args:
+        document (Document): An instance of the `Document` class from pymupdf.
+        start (int): The zero-based index of the first page.
+        end (Optional[int]): The index after the last page, the page count if None.
+
+    Returns:
+        List[Tuple[float, float]]: The (width, height) of each page in points, which is also
+            its size in pixels at a zoom level of 100%.
+    """
+    if end is None:
+        end = document.page_count
+
+    size_list = []
+    for i in range(start, end):
+        rect = document.load_page(i).rect
+        size_list.append((rect.width, rect.height))
+    return size_list
+
+
+def open_document(path: str, password: Optional[str]) -> Document:
+    """
+    Returns the handle of a document owned by the current worker process, opening it if needed.
+
+    Each worker process keeps its own handles, because pymupdf documents cannot be shared
+    between processes. Handles are keyed by the size and modification time of the file
+    as well, so a file replaced on disk is opened again instead of serving its old
+    content. The least recently used handle is closed once more than
+    `MAX_OPEN_DOCUMENTS` documents are open.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+
+    Returns:
+        Document: The opened and authenticated document.
+    """
+    key = get_document_key(path, password)
+    if key in _document_dict:
+        _document_dict.move_to_end(key)
+        return _document_dict[key]
+
+    for old_key in [k for k in _document_dict if k[:2] == key[:2]]:
+        close_document(old_key)
+
+    document = Document(filename=path)
+    if password is not None:
+        document.authenticate(password)
+    _document_dict[key] = document
+
+    if len(_document_dict) > MAX_OPEN_DOCUMENTS:
+        close_document(next(iter(_document_dict)))
+    return document
+
+
+def get_document_key(path: str, password: Optional[str]) -> Tuple:
+    """
+    Builds the key of a document handle, which changes whenever the file is replaced.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+
+    Returns:
+        Tuple: The path, password, size and modification time of the file.
+    """
+    stat = os.stat(path)
+    return (path, password, stat.st_size, stat.st_mtime_ns)
+
+
+def close_document(key: Tuple):
+    """
+    Closes a document handle of the current worker process and drops its display lists.
+
+    Args:
+        key (Tuple): The key of the handle from `get_document_key`.
+    """
+    global _display_list_bytes
+
+    for display_list_key in list(_display_list_dict):
+        if display_list_key[:-1] == key:
+            _display_list_bytes -= _display_list_dict.pop(display_list_key)[1]
+    _document_dict.pop(key).close()
+
+
+def get_display_list(
+    path: str, password: Optional[str], page_index: int
+) -> DisplayList:
+    """
+    Returns the display list of a page, interpreting its content stream if needed.
+
+    Rasterizing a display list skips parsing the page again, which dominates the render
+    time of complex vector pages. The least recently used display lists are dropped once
+    their estimated size exceeds `MAX_DISPLAY_LIST_BYTES`, keeping the newest one.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+        page_index (int): The zero-based index of the page.
+
+    Returns:
+        DisplayList: The display list of the page.
+    """
+    global _display_list_bytes
+
+    key = (*get_document_key(path, password), page_index)
+    if key in _display_list_dict:
+        _display_list_dict.move_to_end(key)
+        return _display_list_dict[key][0]
+
+    document = open_document(path, password)
+    page = document.load_page(page_index)
+    display_list = page.get_displaylist()
+    size = get_display_list_size(document, page)
+    _display_list_dict[key] = (display_list, size)
+    _display_list_bytes += size
+    while _display_list_bytes > MAX_DISPLAY_LIST_BYTES and len(_display_list_dict) > 1:
+        _display_list_bytes -= _display_list_dict.popitem(last=False)[1][1]
+    return display_list
+
+
+def get_display_list_size(document: Document, page: Page) -> int:
+    """
+    Estimates the bytes held by the display list of a page.
+
+    The display list keeps the drawing operators of the content streams and form XObjects
+    of the page, and references its images, so its size follows the stored length of these
+    streams, which is read from their dictionaries without decompressing them.
+
+    Args:
+        document (Document): An instance of the `Document` class from pymupdf.
+        page (Page): The page of the display list.
+
+    Returns:
+        int: The estimated size of the display list in bytes.
+    """
+    if not document.is_pdf:
+        return DEFAULT_DISPLAY_LIST_BYTES
+
+    xref_set = set(page.get_contents())
+    xref_set.update(item[0] for item in page.get_xobjects())
+    xref_set.update(item[0] for item in page.get_images())
+
+    size = DISPLAY_LIST_OVERHEAD
+    for xref in xref_set:
+        value_type, value = document.xref_get_key(xref, "Length")
+        if value_type == "xref":
+            value = document.xref_object(int(value.split()[0])).strip()
+        if value.isdigit():
+            size += int(value)
+    return size
+
+
+def render_display_list(
+    display_list: DisplayList,
+    zoom: float,
+    clip: Optional[Tuple[float, float, float, float]] = None,
+) -> Pixmap:
+    """
+    Rasterizes a display list into an opaque pixmap laid out like `NATIVE_IMAGE_FORMAT`.
+
+    Mirrors `DisplayList.get_pixmap`, except that the pixmap has four bytes per pixel in the
+    native channel order and a white, opaque background, so Qt can use its samples as is.
+
+    Args:
+        display_list (DisplayList): The display list of a page.
+        zoom (float): The scale factor applied to the page, where 1.0 renders at 72 dpi.
+        clip (Optional[Tuple[float, float, float, float]]): The region of the display list,
+            in its own coordinates, to rasterize. The whole display list is rasterized if None.
+
+    Returns:
+        Pixmap: The rendered pixmap.
+    """
+    matrix = mupdf.FzMatrix(zoom, 0, 0, zoom, 0, 0)
+    rect = mupdf.fz_bound_display_list(display_list.this)
+    if clip is not None:
+        rect = mupdf.fz_intersect_rect(rect, mupdf.FzRect(*clip))
+    irect = mupdf.fz_round_rect(mupdf.fz_transform_rect(rect, matrix))
+
+    pixmap = mupdf.fz_new_pixmap_with_bbox(
+        mupdf.FzColorspace(NATIVE_COLORSPACE), irect, mupdf.FzSeparations(), 1
+    )
+    mupdf.fz_clear_pixmap_with_value(pixmap, 0xFF)
+    device = mupdf.fz_new_draw_device_with_bbox(matrix, pixmap, irect)
+    mupdf.fz_run_display_list(
+        display_list.this, device, mupdf.FzMatrix(), rect, mupdf.FzCookie()
+    )
+    mupdf.fz_close_device(device)
+    return Pixmap("raw", pixmap)
+
+
+def render_page_image(
+    path: str,
+    password: Optional[str],
+    page_index: int,
+    zoom: float,
+    clip: Optional[Tuple[float, float, float, float]] = None,
+    cache_path: Optional[str] = None,
+    draft: bool = False,
+) -> Tuple[int, int, int, int, Optional[bytes]]:
+    """
+    Rasterizes a single page of a document. Runs inside a render worker process.
+
+    When the image is written to `cache_path`, its samples are not returned, so they are not
+    pickled back to the main process, which maps the cache file instead.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+        page_index (int): The zero-based index of the page to rasterize.
+        zoom (float): The scale factor applied to the page, where 1.0 renders at 72 dpi.
+        clip (Optional[Tuple[float, float, float, float]]): The region of the page in points,
+            relative to its top left corner, to rasterize. The whole page is rasterized if None.
+        cache_path (Optional[str]): The disk cache file the rendered image is written to.
+        draft (bool): Whether to render with `DRAFT_AA_LEVEL` instead of `FULL_AA_LEVEL`.
+
+    Returns:
+        Tuple[int, int, int, int, Optional[bytes]]: The width, height, stride, `QImage`
+            format, and the raw samples of the rendered page, or None instead of the samples
+            if they were written to `cache_path`.
+    """
+    display_list = get_display_list(path, password, page_index)
+    if clip is not None:
+        x0, y0, x1, y1 = clip
+        page_rect = display_list.rect
+        clip = (
+            x0 + page_rect.x0,
+            y0 + page_rect.y0,
+            x1 + page_rect.x0,
+            y1 + page_rect.y0,
+        )
+    # the level is global to the worker process, so it is set for every job
+    TOOLS.set_aa_level(DRAFT_AA_LEVEL if draft else FULL_AA_LEVEL)
+    page_pixmap = render_display_list(display_list, zoom, clip)
+    image = (
+        page_pixmap.w,
+        page_pixmap.h,
+        page_pixmap.stride,
+        int(NATIVE_IMAGE_FORMAT),
+    )
+    if cache_path is not None and write_image_file(
+        cache_path, *image, page_pixmap.samples_mv
+    ):
+        return (*image, None)
+    return (*image, page_pixmap.samples)
+
+
+def read_document_image(document: Document, xref: int) -> QImage:
+    """
+    Decodes an image of a document into a `QImage` owning its pixels.
+
+    Args:
+        document (Document): An instance of the `Document` class from pymupdf.
+        xref (int): The xref of the image.
+
+    Returns:
+        QImage: The decoded image, a null image if it cannot be decoded.
+    """
+    try:
+        pixmap = Pixmap(document, xref)
+        if pixmap.colorspace is None or pixmap.colorspace.n != 3 or pixmap.alpha:
+            pixmap = Pixmap(csRGB, pixmap, 0)
+    except (RuntimeError, ValueError):
+        return QImage()
+
+    return QImage(
+        pixmap.samples, pixmap.w, pixmap.h, pixmap.stride, QImage.Format_RGB888
+    ).copy()
+
+
+def samples_to_image(
+    width: int, height: int, stride: int, image_format: int, samples: bytes
+) -> QImage:
+    """
+    Wraps the samples returned by `render_page_image` into a `QImage` without copying them.
+
+    The image only stays valid as long as `samples` does, so it should be copied before it
+    is handed to a `QPixmap` or outlives the buffer.
+
+    Args:
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+        stride (int): The number of bytes per line.
+        image_format (int): The `QImage` format of the samples.
+        samples (bytes): The raw samples of the image, or any buffer holding them.
+
+    Returns:
+        QImage: An image referencing `samples`.
+    """
+    return QImage(samples, width, height, stride, QImage.Format(image_format))
+
+
+def write_image_file(
+    path: str, width: int, height: int, stride: int, image_format: int, samples: bytes
+) -> bool:
+    """
+    Writes rendered samples to an image file of the disk cache.
+
+    The file is written under a temporary name and then renamed, so a reader never maps a
+    partially written file. Failures are ignored, as the cache is only an optimization.
+
+    Args:
+        path (str): The path of the image file.
+        width (int): The width of the image in pixels.
+        height (int): The height of the image in pixels.
+        stride (int): The number of bytes per line.
+        image_format (int): The `QImage` format of the samples.
+        samples (bytes): The raw samples of the image, or any buffer holding them.
+
+    Returns:
+        bool: Whether the file was written.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(
+                IMAGE_FILE_HEADER.pack(
+                    IMAGE_FILE_MAGIC, width, height, stride, image_format
+                )
+            )
+            f.write(samples)
+        os.replace(temp_path, path)
+        return True
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+
+
+def read_image_file(path: str) -> Optional[QImage]:
+    """
+    Reads an image file of the disk cache into a `QImage` owning its samples.
+
+    The file is memory-mapped, so its samples are copied once, straight into the image.
+
+    Args:
+        path (str): The path of the image file.
+
+    Returns:
+        Optional[QImage]: The image, or None if the file is missing or invalid.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped_file = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    with mapped_file:
+        if len(mapped_file) < IMAGE_FILE_HEADER.size:
+            return None
+
+        magic, width, height, stride, image_format = IMAGE_FILE_HEADER.unpack_from(
+            mapped_file
+        )
+        if (
+            magic != IMAGE_FILE_MAGIC
+            or len(mapped_file) < IMAGE_FILE_HEADER.size + stride * height
+        ):
+            return None
+
+        samples = memoryview(mapped_file)[IMAGE_FILE_HEADER.size :]
+        image = samples_to_image(width, height, stride, image_format, samples).copy()
+        samples.release()
+    return image
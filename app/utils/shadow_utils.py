@@ -0,0 +1,136 @@
+# coding:utf-8
+from typing import Dict, Tuple
+
+from PyQt5.QtCore import Qt, QRect, QRectF
+from PyQt5.QtGui import QColor, QImage, QPainter, QPen, QPixmap
+from PyQt5.QtWidgets import (
+    QGraphicsDropShadowEffect,
+    QGraphicsRectItem,
+    QGraphicsScene,
+)
+
+from lib import isDarkTheme
+
+SHADOW_BLUR_RADIUS = 15
+# side of the blurred square in blur radii, large enough for the middle of its edges to
+# be unaffected by the corners
+SHADOW_PATCH_SIZE = 6
+LIGHT_SHADOW_COLOR = QColor(10, 10, 10, 100)
+DARK_SHADOW_COLOR = QColor(0, 0, 0, 160)
+
+# pre-blurred nine-patches by (dark theme, device pixel ratio)
+_shadow_dict: Dict[Tuple[bool, float], QPixmap] = {}
+
+
+def create_shadow_pixmap(
+    color: QColor, blur_radius: int, device_pixel_ratio: float
+) -> QPixmap:
+    """
+    Blurs the drop shadow of a square once into a nine-patch pixmap.
+
+    The shadow comes from the `QGraphicsDropShadowEffect` pages used to carry, so it
+    looks the same, but it is blurred once instead of on every repaint of every page.
+
+    Args:
+        color (QColor): The color of the shadow.
+        blur_radius (int): The blur radius of the shadow, which is also the width of the
+            border of the nine-patch.
+        device_pixel_ratio (float): The device pixel ratio the pixmap is painted at.
+
+    Returns:
+        QPixmap: A square pixmap of `SHADOW_PATCH_SIZE * blur_radius` logical pixels,
+            whose center is transparent.
+    """
+    size = SHADOW_PATCH_SIZE * blur_radius
+    inner_size = size - 2 * blur_radius
+    inner_rect = QRectF(blur_radius, blur_radius, inner_size, inner_size)
+    item = QGraphicsRectItem(inner_rect.translated(-blur_radius, -blur_radius))
+    item.setBrush(Qt.black)
+    item.setPen(QPen(Qt.NoPen))
+
+    effect = QGraphicsDropShadowEffect()
+    effect.setBlurRadius(blur_radius)
+    effect.setColor(color)
+    effect.setOffset(0, 0)
+    item.setGraphicsEffect(effect)
+
+    scene = QGraphicsScene()
+    scene.addItem(item)
+
+    image = QImage(
+        round(size * device_pixel_ratio),
+        round(size * device_pixel_ratio),
+        QImage.Format_ARGB32_Premultiplied,
+    )
+    image.setDevicePixelRatio(device_pixel_ratio)
+    image.fill(Qt.transparent)
+
+    painter = QPainter(image)
+    scene.render(
+        painter,
+        QRectF(0, 0, size, size),
+        QRectF(-blur_radius, -blur_radius, size, size),
+    )
+    # the page covers the center, only the border is ever drawn
+    painter.setCompositionMode(QPainter.CompositionMode_Clear)
+    painter.fillRect(inner_rect, Qt.transparent)
+    painter.end()
+    return QPixmap.fromImage(image)
+
+
+def get_shadow_pixmap(device_pixel_ratio: float) -> QPixmap:
+    """
+    Returns the shadow nine-patch of the current theme, creating it on first use.
+
+    Args:
+        device_pixel_ratio (float): The device pixel ratio the pixmap is painted at.
+
+    Returns:
+        QPixmap: The shadow nine-patch.
+    """
+    key = (isDarkTheme(), device_pixel_ratio)
+    if key not in _shadow_dict:
+        color = DARK_SHADOW_COLOR if key[0] else LIGHT_SHADOW_COLOR
+        _shadow_dict[key] = create_shadow_pixmap(
+            color, SHADOW_BLUR_RADIUS, device_pixel_ratio
+        )
+    return _shadow_dict[key]
+
+
+def draw_shadow(painter: QPainter, rect: QRect, device_pixel_ratio: float):
+    """
+    Draws the drop shadow around a rectangle from the border of the nine-patch.
+
+    The corners are copied and a one pixel wide slice from the middle of each edge is
+    stretched along the rectangle, so a shadow costs eight small blits at any page size.
+
+    Args:
+        painter (QPainter): The painter to draw with.
+        rect (QRect): The rectangle casting the shadow.
+        device_pixel_ratio (float): The device pixel ratio of the paint device.
+    """
+    pixmap = get_shadow_pixmap(device_pixel_ratio)
+    radius = SHADOW_BLUR_RADIUS
+    size = SHADOW_PATCH_SIZE * radius
+    end = size - radius
+    middle = size / 2
+    left, top = rect.x() - radius, rect.y() - radius
+    right, bottom = rect.x() + rect.width(), rect.y() + rect.height()
+
+    # (target, source) in logical pixels, corners first, then edges
+    patch_list = [
+        ((left, top, radius, radius), (0, 0, radius, radius)),
+        ((right, top, radius, radius), (end, 0, radius, radius)),
+        ((left, bottom, radius, radius), (0, end, radius, radius)),
+        ((right, bottom, radius, radius), (end, end, radius, radius)),
+        ((rect.x(), top, rect.width(), radius), (middle, 0, 1, radius)),
+        ((rect.x(), bottom, rect.width(), radius), (middle, end, 1, radius)),
+        ((left, rect.y(), radius, rect.height()), (0, middle, radius, 1)),
+        ((right, rect.y(), radius, rect.height()), (end, middle, radius, 1)),
+    ]
+    for target, source in patch_list:
+        painter.drawPixmap(
+            QRectF(*target),
+            pixmap,
+            QRectF(*(value * device_pixel_ratio for value in source)),
+        )
@@ -1,10 +1,47 @@
 # coding:utf-8
 
 import re
+import html
+import unicodedata
 
 from enum import Enum
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime, timedelta, timezone
 
+from pymupdf import (
+    Document,
+    Page,
+    TextPage,
+    TEXTFLAGS_XHTML,
+    TEXT_PRESERVE_IMAGES,
+    mupdf,
+)
+
+from .render_utils import open_document
+
+try:
+    from re import _parser as sre_parse
+except ImportError:
+    import sre_parse
+
+# scheme of the image urls in page html, resolved by the text view when painted
+IMAGE_URL_SCHEME = "page-image"
+# flags of the shared text pages, the XHTML flags without images equal the plain text
+# ones, so a single text page serves the text, the HTML and searches of a page
+TEXT_PAGE_FLAGS = TEXTFLAGS_XHTML & ~TEXT_PRESERVE_IMAGES
+# flags of the text pages of the HTML with images, whose image blocks only reference
+# the images of the page, their data is neither decoded nor copied
+HTML_TEXT_PAGE_FLAGS = TEXTFLAGS_XHTML
+# tags of the styles of a font, in nesting order
+FONT_STYLE_TAGS = ("tt", "b", "i")
+# characters mupdf ends words at, so the words of the text of a page are the ones of
+# `TextPage.extractWORDS`
+WORD_DELIMITER_PATTERN = re.compile(r"[\x00-\x20\xa0]+")
+# runs of letters and digits, the terms of the search index
+TERM_PATTERN = re.compile(r"\w+")
+# errors raised by mupdf on a damaged page, which fail that page but not its batch
+PAGE_ERRORS = (RuntimeError, ValueError, mupdf.FzErrorBase)
+
 
 class DateFormat(Enum):
     """
@@ -119,3 +156,453 @@ def truncate_text(text: str, max_length: int, ellipsis: str = "...") -> str:
         truncated_text = text
 
     return truncated_text
+
+
+def get_page_content_flags(
+    path: str, password: Optional[str], start: int, end: int
+) -> List[Tuple[bool, bool]]:
+    """
+    Tells which pages of a range may hold text and which show images. Runs inside a
+    render worker process.
+
+    Both are read from the resources of the pages without interpreting their content
+    streams, so no text is parsed here only to be thrown away. The text of the pages the
+    text view shows is extracted by `extract_page_content`. A page that cannot be loaded
+    may hold text as far as this tells.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+        start (int): The zero-based index of the first page.
+        end (int): The index after the last page.
+
+    Returns:
+        List[Tuple[bool, bool]]: Whether each page may hold text and whether it has images.
+    """
+    document = open_document(path, password)
+    flag_list = []
+    for i in range(start, end):
+        try:
+            page = document.load_page(i)
+            flag_list.append((may_have_text(document, page), bool(page.get_images())))
+        except PAGE_ERRORS:
+            # whether the page holds text is left to its extraction
+            flag_list.append((True, False))
+    return flag_list
+
+
+def extract_page_content(
+    path: str,
+    password: Optional[str],
+    page_list: List[int],
+    is_html: bool,
+    show_images: bool,
+) -> List[str]:
+    """
+    Extracts the text or the HTML of pages for the text view. Runs inside a render worker
+    process.
+
+    A page that cannot be parsed gets no content, the other pages of the batch are still
+    extracted.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+        page_list (List[int]): The zero-based indexes of the pages to extract.
+        is_html (bool): Whether to extract the HTML of the pages instead of their text.
+        show_images (bool): Whether the HTML references the images of the pages.
+
+    Returns:
+        List[str]: The text or HTML of each page of `page_list`.
+    """
+    document = open_document(path, password)
+    content_list = []
+    for i in page_list:
+        try:
+            page = document.load_page(i)
+            if is_html:
+                content_list.append(get_page_html(page, show_images))
+            else:
+                content_list.append(create_text_page(page).extractText())
+        except PAGE_ERRORS:
+            content_list.append("")
+    return content_list
+
+
+def may_have_text(document: Document, page: Page) -> bool:
+    """
+    Tells from the resources of a page whether it may hold text, without parsing it.
+
+    Only PDF pages list their fonts, pymupdf reports none for the pages of any other
+    format, so those always may hold text.
+
+    Args:
+        document (Document): An instance of the `Document` class from pymupdf.
+        page (Page): A page of `document`.
+
+    Returns:
+        bool: False if the page is a PDF page without any font, True otherwise.
+    """
+    return not document.is_pdf or bool(page.get_fonts())
+
+
+def fold_text(text: str) -> str:
+    """
+    Folds the case and accents of a text, so "Übung" and "ubung" compare equal.
+
+    Args:
+        text (str): The text to fold.
+
+    Returns:
+        str: The text decomposed by compatibility, without combining marks and casefolded.
+    """
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def get_words(text: str) -> List[str]:
+    """
+    Splits the text of a page into words like `TextPage.extractWORDS` does.
+
+    Args:
+        text (str): The text of a page from `TextPage.extractText`.
+
+    Returns:
+        List[str]: The words of the text, in order.
+    """
+    return [word for word in WORD_DELIMITER_PATTERN.split(text) if word]
+
+
+def get_terms(text: str) -> List[str]:
+    """
+    Splits a text into the folded terms of the search index.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The folded runs of letters and digits of the text.
+    """
+    return TERM_PATTERN.findall(fold_text(text))
+
+
+def extract_library_text(path: str, start: int, end: int) -> Tuple[int, List[str]]:
+    """
+    Extracts the text of a range of pages for the library index. Runs inside a render
+    worker process.
+
+    The text is normalized by compatibility, so ligatures such as "ﬁ" match the letters
+    they stand for. Case and accents are left for the tokenizer of the index to fold.
+
+    Args:
+        path (str): The file path to the document.
+        start (int): The zero-based index of the first page.
+        end (int): The index after the last page, clamped to the page count.
+
+    Returns:
+        Tuple[int, List[str]]: The page count of the document and the normalized text of
+            each page of the range, or no pages if the document needs a password.
+    """
+    document = open_document(path, None)
+    if document.needs_pass:
+        return 0, []
+
+    text_list = []
+    for i in range(start, min(end, document.page_count)):
+        page = document.load_page(i)
+        text = page.get_text("text") if may_have_text(document, page) else ""
+        text_list.append(unicodedata.normalize("NFKC", text))
+    return document.page_count, text_list
+
+
+def get_trigrams(text: str) -> Set[str]:
+    """
+    Gets the trigrams of the folded form of a text.
+
+    Folding works character by character, so the trigrams of a substring of a text are
+    always trigrams of the text.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        Set[str]: The distinct runs of three characters of the folded text.
+    """
+    text = fold_text(text)
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def get_regex_literals(pattern: str) -> List[str]:
+    """
+    Gets the literal strings every match of a regular expression contains.
+
+    Only consecutive literal characters outside of repetitions and alternatives are
+    collected, so the result is conservative: a page whose text lacks a trigram of one
+    of the literals cannot match, but a page holding all of them may still not match.
+
+    Args:
+        pattern (str): The regular expression.
+
+    Returns:
+        List[str]: The required literal strings.
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression.
+    """
+    literal_list = [""]
+
+    def walk(item_list):
+        for op, value in item_list:
+            if op == sre_parse.LITERAL:
+                literal_list[-1] += chr(value)
+            elif op == sre_parse.SUBPATTERN:
+                walk(value[-1])
+            elif op != sre_parse.AT:
+                # anchors take no characters, anything else breaks the literal run
+                literal_list.append("")
+
+    walk(sre_parse.parse(pattern))
+    return [literal for literal in literal_list if literal]
+
+
+def index_page_words(
+    path: str, password: Optional[str], start: int, end: int
+) -> Tuple[Dict[str, List[Tuple[int, int]]], Dict[str, int], List[str]]:
+    """
+    Builds the inverted index of a range of pages. Runs inside a render worker process.
+
+    Each page is parsed once, with `TEXT_PAGE_FLAGS`. Its text is returned, so that
+    searches and the text view do not parse the page again. Words are numbered in the
+    order of `get_words`, which is the order of `TextPage.extractWORDS`, so a position
+    can be mapped back to the rectangle of the word on the page. A word such as
+    "ERR-2498" holds several terms at the same position. The trigrams of the text of
+    the pages are collected as well, to filter substring and regex searches. A page that
+    cannot be parsed is indexed without text, the other pages of the batch still are.
+
+    Args:
+        path (str): The file path to the document.
+        password (Optional[str]): The password the document was authenticated with, if any.
+        start (int): The zero-based index of the first page.
+        end (int): The index after the last page.
+
+    Returns:
+        Tuple[Dict[str, List[Tuple[int, int]]], Dict[str, int], List[str]]: The (page
+            index, word position) of each term in page order, the pages holding each
+            trigram as a bit mask whose bit `i` stands for page `start + i`, and the
+            text of each page of the range.
+    """
+    document = open_document(path, password)
+    posting_dict = {}
+    trigram_dict = {}
+    text_list = []
+    for i in range(start, end):
+        text = ""
+        try:
+            page = document.load_page(i)
+            if may_have_text(document, page):
+                text = create_text_page(page).extractText()
+        except PAGE_ERRORS:
+            # a damaged page is indexed without text, the rest of the batch is kept
+            pass
+        text_list.append(text)
+
+        for position, word in enumerate(get_words(text)):
+            for term in get_terms(word):
+                posting_dict.setdefault(term, []).append((i, position))
+
+        bit = 1 << (i - start)
+        for trigram in get_trigrams(text):
+            trigram_dict[trigram] = trigram_dict.get(trigram, 0) | bit
+    return posting_dict, trigram_dict, text_list
+
+
+def search_page_text(
+    page_list: List[int],
+    text_list: List[str],
+    pattern: str,
+    max_hits: int,
+    context_chars: int = 40,
+) -> List[Tuple[int, str, int, str]]:
+    """
+    Runs a case-insensitive regular expression over the text of pages. Runs inside a
+    render worker process.
+
+    The text comes from `index_page_words`, so no page is parsed for a search.
+
+    Args:
+        page_list (List[int]): The zero-based indexes of the pages to search, in order.
+        text_list (List[str]): The text of each page of `page_list`.
+        pattern (str): The regular expression.
+        max_hits (int): The number of matches to stop at.
+        context_chars (int): The number of characters shown around a match.
+
+    Returns:
+        List[Tuple[int, str, int, str]]: The page index, matched text, occurrence of the
+            matched text on the page and snippet of each non-empty match, in page order.
+    """
+    regex = re.compile(pattern, re.IGNORECASE)
+    hit_list = []
+    for i, text in zip(page_list, text_list):
+        occurrence_dict = {}
+        for match in regex.finditer(text):
+            if not match.group():
+                continue
+
+            occurrence = occurrence_dict.get(match.group().casefold(), 0)
+            occurrence_dict[match.group().casefold()] = occurrence + 1
+            start = max(match.start() - context_chars, 0)
+            snippet = " ".join(text[start : match.end() + context_chars].split())
+            hit_list.append((i, match.group(), occurrence, snippet))
+            if len(hit_list) >= max_hits:
+                return hit_list
+    return hit_list
+
+
+def create_text_page(page: Page) -> TextPage:
+    """
+    Parses the text layer of a page with `TEXT_PAGE_FLAGS`.
+
+    Args:
+        page (Page): An instance of the `Page` class from pymupdf.
+
+    Returns:
+        TextPage: The text page, which stays valid after the page is released.
+    """
+    return page.get_textpage(flags=TEXT_PAGE_FLAGS)
+
+
+def get_page_html(page: Page, show_images: bool, max_image_width: int = 300) -> str:
+    """
+    Converts a page to HTML without embedding its images.
+
+    The page is parsed once. The HTML of a page without images is written by
+    `TextPage.extractXHTML`. On a page with images, the text blocks are written the
+    same way by `get_text_block_html`, and the image blocks are referenced by their xref
+    through `IMAGE_URL_SCHEME` urls at their place in the text, with their size set. No
+    image is decoded or encoded as a data URI, the view only decodes the images it paints.
+
+    Args:
+        page (Page): An instance of the `Page` class from pymupdf.
+        show_images (bool): Whether to reference the images of the page.
+        max_image_width (int): The width images are scaled down to, in pixels.
+
+    Returns:
+        str: The HTML of the page.
+    """
+    xref_dict = get_image_xref_dict(page) if show_images else {}
+    if not xref_dict:
+        return create_text_page(page).extractXHTML()
+
+    text_page = page.get_textpage(flags=HTML_TEXT_PAGE_FLAGS)
+    style_dict = {}
+    html_list = [f'<div id="page{page.number}">\n']
+    for block in text_page.this:
+        if block.m_internal.type == mupdf.FZ_STEXT_BLOCK_TEXT:
+            html_list.append(get_text_block_html(block, style_dict))
+            continue
+
+        xref = xref_dict.get(int(block.i_image().m_internal.this))
+        bbox = block.m_internal.bbox
+        if not xref or bbox.x1 <= bbox.x0 or bbox.y1 <= bbox.y0:
+            continue
+
+        width = min(round(bbox.x1 - bbox.x0), max_image_width)
+        height = round((bbox.y1 - bbox.y0) * width / (bbox.x1 - bbox.x0))
+        html_list.append(
+            f'<p><img src="{IMAGE_URL_SCHEME}:{xref}" '
+            f'width="{width}" height="{height}"></p>\n'
+        )
+    html_list.append("</div>\n")
+    return "".join(html_list)
+
+
+def get_image_xref_dict(page: Page) -> Dict[int, int]:
+    """
+    Maps the images mupdf loaded for a page to their xrefs.
+
+    mupdf keeps the images it loads in its store, so loading an image returns the same
+    instance the content stream of the page is interpreted with, and the image blocks of
+    a text page can be told apart by their image even if several images share a size.
+
+    Args:
+        page (Page): An instance of the `Page` class from pymupdf.
+
+    Returns:
+        Dict[int, int]: The xref of each image of the page by the address of its image,
+            empty for the pages of any format other than PDF.
+    """
+    document = page.parent
+    if not document.is_pdf:
+        return {}
+
+    pdf = mupdf.pdf_document_from_fz_document(document.this)
+    xref_dict = {}
+    for item in page.get_images(full=True):
+        try:
+            image = mupdf.pdf_load_image(pdf, mupdf.pdf_new_indirect(pdf, item[0], 0))
+        except PAGE_ERRORS:
+            continue
+        xref_dict[int(image.m_internal.this)] = item[0]
+    return xref_dict
+
+
+def get_text_block_html(block: mupdf.FzStextBlock, style_dict: Dict[str, Tuple]) -> str:
+    """
+    Converts a text block of a text page to HTML like `TextPage.extractXHTML` does.
+
+    A block whose characters all have the same size of 12 points or more is a heading,
+    any other block a paragraph, and runs of monospaced, bold or italic characters are
+    wrapped in their tags.
+
+    Args:
+        block (mupdf.FzStextBlock): A text block of a text page.
+        style_dict (Dict[str, Tuple]): The style tags by font name, filled as fonts are
+            met, shared by the blocks of a page.
+
+    Returns:
+        str: The HTML of the block.
+    """
+    size_set = set()
+    html_list = []
+    tag_tuple = ()
+    char_list = []
+    for line in block:
+        if size_set:
+            char_list.append(" ")
+
+        for char in line:
+            size_set.add(char.m_internal.size)
+            font = char.m_internal.font
+            name = mupdf.ll_fz_font_name(font)
+            style = style_dict.get(name)
+            if style is None:
+                font = mupdf.FzFont(mupdf.ll_fz_keep_font(font))
+                style = style_dict[name] = tuple(
+                    tag
+                    for tag, is_set in zip(
+                        FONT_STYLE_TAGS,
+                        (
+                            font.fz_font_is_monospaced(),
+                            font.fz_font_is_bold(),
+                            font.fz_font_is_italic(),
+                        ),
+                    )
+                    if is_set
+                )
+
+            if style != tag_tuple:
+                html_list.append(html.escape("".join(char_list), quote=False))
+                html_list.extend(f"</{tag}>" for tag in reversed(tag_tuple))
+                html_list.extend(f"<{tag}>" for tag in style)
+                tag_tuple = style
+                char_list = []
+            char_list.append(chr(char.m_internal.c))
+
+    html_list.append(html.escape("".join(char_list), quote=False))
+    html_list.extend(f"</{tag}>" for tag in reversed(tag_tuple))
+
+    tag = "p"
+    if len(size_set) == 1:
+        size = size_set.pop()
+        tag = "h1" if size >= 20 else "h2" if size >= 15 else "h3" if size >= 12 else "p"
+    return f"<{tag}>{''.join(html_list)}</{tag}>\n"
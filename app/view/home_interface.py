@@ -1,5 +1,6 @@
 # coding:utf-8
 import os
+import time
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QStackedWidget
@@ -87,18 +88,18 @@ class HomeInterface(QWidget):
         self.tab_bar_card.setVisible(self.show_tab_bar_card)
         self.stacked_widget.setVisible(self.show_stacked_widget)
 
+    @staticmethod
+    def get_route_key(path):
+        """get the route key of the tab of a file, files with the same name get their own tab"""
+        return os.path.normcase(os.path.abspath(path))
+
     def add_file(self, path):
         """add file"""
-        doc, state, tooltip_type, title, content = validate_file(self, path)
-        self.show_tooltip(tooltip_type, title, content)
-
-        if not state:
-            return
-
         file_name = os.path.basename(path)
-        if file_name in self.tab_bar.itemMap:
-            self.tab_bar.setCurrentTab(file_name)
-            qrouter.push(self.stacked_widget, file_name)
+        route_key = self.get_route_key(path)
+        if route_key in self.tab_bar.itemMap:
+            self.tab_bar.setCurrentTab(route_key)
+            qrouter.push(self.stacked_widget, route_key)
             self.show_drop_card = False
             self.show_stacked_widget = True
             self.update_visibility()
@@ -109,14 +110,35 @@ class HomeInterface(QWidget):
             )
             return
 
-        view_area = ViewArea(path, doc)
-        self.add_sub_interface(view_area, file_name, file_name)
+        # time to first page includes validating and opening the file
+        open_time = time.perf_counter()
+        doc, state, tooltip_type, title, content = validate_file(self, path)
+        self.show_tooltip(tooltip_type, title, content)
+
+        if not state:
+            return
+
+        view_area = ViewArea(path, doc, open_time=open_time)
+        self.add_sub_interface(view_area, route_key, file_name)
+        self.tab_bar.setTabToolTip(len(self.tab_bar.items) - 1, path)
 
         self.show_drop_card = False
         self.show_tab_bar_card = True
         self.show_stacked_widget = True
         self.update_visibility()
 
+    def open_file(self, path, page_count):
+        """open a file, or switch to its tab, and go to a page"""
+        view_area = self.findChild(ViewArea, self.get_route_key(path))
+        if view_area is None:
+            self.add_file(path)
+            view_area = self.findChild(ViewArea, self.get_route_key(path))
+        else:
+            self.on_sub_interface_clicked(view_area)
+
+        if view_area is not None:
+            view_area.go_to_page(page_count)
+
     def add_sub_interface(self, widget, object_name, text):
         """add sub interface"""
         widget.setObjectName(object_name)
@@ -0,0 +1,127 @@
+# coding:utf-8
+import os
+
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QListWidgetItem
+
+from lib import (
+    ListWidget,
+    CardWidget,
+    CaptionLabel,
+    SubtitleLabel,
+    SearchLineEdit,
+    HorizontalSeparator,
+)
+
+from ..common.config import cfg
+from ..common.style_sheet import StyleSheet
+from ..common.signal_bus import signalBus
+from ..common.library_index import libraryIndex
+
+
+class LibraryInterface(QWidget):
+    """Library interface"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        self.setObjectName("LibraryInterface")
+        # initialize style sheet
+        StyleSheet.HOME_INTERFACE.apply(self)
+
+        self.indexed_document_count = 0
+        self.document_count = 0
+
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(20, 20, 20, 20)
+
+        self.card = CardWidget(self)
+        self.card_layout = QVBoxLayout(self.card)
+        self.card_layout.setContentsMargins(10, 10, 10, 10)
+        self.card_layout.setSpacing(10)
+
+        self.title_layout = QHBoxLayout()
+        self.title_layout.setContentsMargins(0, 0, 0, 0)
+        self.title_layout.setSpacing(10)
+
+        self.query_timer = QTimer(self)
+        self.query_timer.setSingleShot(True)
+        self.query_timer.setInterval(200)
+        self.query_timer.timeout.connect(self.search)
+
+        self.init_widget()
+        self.init_layout()
+        self.update_status()
+
+        libraryIndex.progress_changed.connect(self.on_progress_changed)
+
+    def init_widget(self):
+        """initialize widget"""
+        self.title_text = SubtitleLabel("Library", self.card)
+        self.sep = HorizontalSeparator(self.card)
+
+        self.search_line_edit = SearchLineEdit(self.card)
+        self.search_line_edit.setPlaceholderText("Search in library folders")
+        self.search_line_edit.textChanged.connect(self.query_timer.start)
+        self.search_line_edit.searchSignal.connect(self.search)
+
+        self.status_label = CaptionLabel(self.card)
+
+        self.result_list = ListWidget(self.card)
+        self.result_list.setWordWrap(True)
+        self.result_list.itemClicked.connect(self.on_item_clicked)
+
+    def init_layout(self):
+        """initialize layout"""
+        self.title_layout.addWidget(self.title_text)
+        self.title_layout.addStretch()
+        self.card_layout.addLayout(self.title_layout)
+        self.card_layout.addWidget(self.sep)
+        self.card_layout.addWidget(self.search_line_edit)
+        self.card_layout.addWidget(self.status_label)
+        self.card_layout.addWidget(self.result_list)
+        self.main_layout.addWidget(self.card)
+
+    def search(self):
+        """search the library index"""
+        hit_list = libraryIndex.search(self.search_line_edit.text())
+        self.result_list.clear()
+        for hit in hit_list:
+            item = QListWidgetItem(
+                f"{os.path.basename(hit.path)}, page {hit.page_index + 1}\n{hit.snippet}"
+            )
+            item.setData(Qt.UserRole, hit)
+            item.setToolTip(hit.path)
+            self.result_list.addItem(item)
+        self.update_status(len(hit_list))
+
+    def on_item_clicked(self, item):
+        """open the document of the clicked hit at its page"""
+        hit = item.data(Qt.UserRole)
+        signalBus.documentOpenRequested.emit(hit.path, hit.page_index + 1)
+
+    def on_progress_changed(self, indexed_document_count, document_count):
+        """on progress changed"""
+        self.indexed_document_count = indexed_document_count
+        self.document_count = document_count
+        self.update_status()
+
+    def update_status(self, hit_count=None):
+        """show the hit count and the indexing progress"""
+        if not cfg.get(cfg.libraryIndexEnabled):
+            self.status_label.setText(
+                "Turn on the library index and add library folders in the settings"
+            )
+            return
+
+        status_list = []
+        if hit_count is not None and self.search_line_edit.text().strip():
+            status_list.append(f"{hit_count} results")
+        if self.indexed_document_count < self.document_count:
+            status_list.append(
+                f"indexing {self.indexed_document_count} / {self.document_count} documents"
+            )
+        else:
+            status_list.append(f"{self.document_count} documents indexed")
+        status = ", ".join(status_list)
+        self.status_label.setText(status[:1].upper() + status[1:])
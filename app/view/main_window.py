@@ -15,8 +15,10 @@ from lib import (
 from ..utils.version_manager import VersionManager
 from .home_interface import HomeInterface
 from .setting_interface import SettingInterface
+from .library_interface import LibraryInterface
 from ..common.signal_bus import signalBus
 from ..common.config import cfg
+from ..common.library_index import libraryIndex
 from ..common.setting import RELEASE_URL, APP_NAME
 from ..common import resource
 
@@ -33,6 +35,7 @@ class MainWindow(FluentWindow):
         self.init_navigation()
         self.connect_signal_to_slot()
         self.splash_screen.finish()
+        libraryIndex.update()
 
         # check for updates
         if cfg.get(cfg.checkUpdateAtStartUp):
@@ -41,11 +44,13 @@ class MainWindow(FluentWindow):
     def init_interface(self):
         """Initialize the interfaces"""
         self.home_interface = HomeInterface(self)
+        self.library_interface = LibraryInterface(self)
         self.settings_interface = SettingInterface(self)
 
     def init_navigation(self):
         """Add navigation items"""
         self.addSubInterface(self.home_interface, FluentIcon.HOME, "Home")
+        self.addSubInterface(self.library_interface, FluentIcon.LIBRARY, "Library")
         self.addSubInterface(
             self.settings_interface,
             FluentIcon.SETTING,
@@ -84,6 +89,12 @@ class MainWindow(FluentWindow):
     def connect_signal_to_slot(self):
         """connect signal to slot"""
         signalBus.micaEnableChanged.connect(self.setMicaEffectEnabled)
+        signalBus.documentOpenRequested.connect(self.open_document)
+
+    def open_document(self, path, page_count):
+        """open a document at a page in the home interface"""
+        self.switchTo(self.home_interface)
+        self.home_interface.open_file(path, page_count)
 
     def check_update(self, ignore: bool = False):
         """check software update
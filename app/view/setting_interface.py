@@ -1,5 +1,5 @@
 # coding:utf-8
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QStandardPaths
 from PyQt5.QtWidgets import QWidget, QLabel
 
 from lib import (
@@ -10,7 +10,9 @@ from lib import (
     ExpandLayout,
     setThemeColor,
     SettingCardGroup,
+    RangeSettingCard,
     SwitchSettingCard,
+    FolderListSettingCard,
     OptionsSettingCard,
     CustomColorSettingCard,
 )
@@ -18,6 +20,8 @@ from lib import (
 from ..common.style_sheet import StyleSheet
 from ..common.config import cfg, is_win_11
 from ..common.signal_bus import signalBus
+from ..common.page_cache import pageCache
+from ..common.disk_cache import diskCache
 
 
 class SettingInterface(ScrollArea):
@@ -100,6 +104,58 @@ class SettingInterface(ScrollArea):
             parent=self.personal_group,
         )
 
+        # render
+        self.render_group = SettingCardGroup("Render", self.scroll_widget)
+        self.page_cache_card = RangeSettingCard(
+            cfg.pageCacheSize,
+            FluentIcon.SPEED_HIGH,
+            "Page cache size (MB)",
+            "Memory kept for rendered pages, least recently viewed pages are released first",
+            self.render_group,
+        )
+        self.disk_cache_card = RangeSettingCard(
+            cfg.diskCacheSize,
+            FluentIcon.SAVE,
+            "Disk cache size (MB)",
+            "Disk space kept for rendered pages so reopened documents show up instantly",
+            self.render_group,
+        )
+        self.text_page_cache_card = RangeSettingCard(
+            cfg.textPageCacheSize,
+            FluentIcon.FONT,
+            "Text cache size (MB)",
+            "Memory kept for the text of pages of each document, shared by the text view and search",
+            self.render_group,
+        )
+
+        # text view
+        self.text_view_group = SettingCardGroup("Text view", self.scroll_widget)
+        self.html_images_card = SwitchSettingCard(
+            FluentIcon.PHOTO,
+            "Images in HTML",
+            "Show the images of pages in the HTML tab, they are decoded when scrolled into view",
+            cfg.showHtmlImages,
+            self.text_view_group,
+        )
+
+        # library
+        self.library_group = SettingCardGroup("Library", self.scroll_widget)
+        self.library_index_card = SwitchSettingCard(
+            FluentIcon.LIBRARY,
+            "Library index",
+            "Index the text of the documents in the library folders to search them without opening them",
+            cfg.libraryIndexEnabled,
+            self.library_group,
+        )
+        self.library_folders_card = FolderListSettingCard(
+            cfg.libraryFolders,
+            "Library folders",
+            directory=QStandardPaths.writableLocation(
+                QStandardPaths.DocumentsLocation
+            ),
+            parent=self.library_group,
+        )
+
         # update software
         self.update_software_group = SettingCardGroup(
             "Software update", self.scroll_widget
@@ -119,9 +175,21 @@ class SettingInterface(ScrollArea):
         self.personal_group.addSettingCard(self.theme_color_card)
         self.personal_group.addSettingCard(self.zoom_card)
 
+        self.render_group.addSettingCard(self.page_cache_card)
+        self.render_group.addSettingCard(self.disk_cache_card)
+        self.render_group.addSettingCard(self.text_page_cache_card)
+
+        self.text_view_group.addSettingCard(self.html_images_card)
+
+        self.library_group.addSettingCard(self.library_index_card)
+        self.library_group.addSettingCard(self.library_folders_card)
+
         self.update_software_group.addSettingCard(self.update_on_start_up_card)
 
         self.expand_layout.addWidget(self.personal_group)
+        self.expand_layout.addWidget(self.render_group)
+        self.expand_layout.addWidget(self.text_view_group)
+        self.expand_layout.addWidget(self.library_group)
         self.expand_layout.addWidget(self.update_software_group)
 
     def show_restart_tooltip(self):
@@ -141,3 +209,11 @@ class SettingInterface(ScrollArea):
         self.mica_card.checkedChanged.connect(signalBus.micaEnableChanged)
         self.theme_card.optionChanged.connect(lambda ci: setTheme(cfg.get(ci)))
         self.theme_color_card.colorChanged.connect(lambda c: setThemeColor(c))
+
+        # render
+        self.page_cache_card.valueChanged.connect(
+            lambda value: pageCache.set_max_bytes(value * 1024 * 1024)
+        )
+        self.disk_cache_card.valueChanged.connect(
+            lambda value: diskCache.set_max_bytes(value * 1024 * 1024)
+        )
@@ -2,14 +2,20 @@
 import os
 import sys
 
+from multiprocessing import freeze_support
+
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 
 from app import cfg
 from app import MainWindow
+from app.common.render_service import renderService
 
 
 if __name__ == "__main__":
+    # render workers are spawned from the frozen executable
+    freeze_support()
+
     # enable dpi scale
     if cfg.get(cfg.dpiScale) == "Auto":
         QApplication.setHighDpiScaleFactorRoundingPolicy(
@@ -26,8 +32,12 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     app.setAttribute(Qt.AA_DontCreateNativeWidgetSiblings)
 
+    # spawn render workers while the main window is being created
+    renderService.start()
+
     # create main window
     w = MainWindow()
     w.show()
 
     app.exec_()
+    renderService.shutdown()
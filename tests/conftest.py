@@ -0,0 +1,16 @@
+# coding: utf-8
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """application instance needed by pixmaps"""
+    from PyQt5.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication([])
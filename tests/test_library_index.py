@@ -0,0 +1,115 @@
+# coding: utf-8
+import pytest
+
+from app.common import library_index
+from app.common.config import cfg
+from app.common.library_index import PAGE_BITS, LibraryHit, LibraryIndex
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    """library index in a temporary database, its worker jobs collected in `job_list`"""
+    job_list = []
+    monkeypatch.setattr(
+        library_index.renderService, "extract_library_text", job_list.append
+    )
+    monkeypatch.setattr(library_index.renderService, "scan_folders", job_list.append)
+    # turning the index on updates the existing library indexes, after the patches so
+    # none of them starts a worker
+    monkeypatch.setattr(cfg.libraryIndexEnabled, "value", True)
+
+    index = LibraryIndex(tmp_path / "library.db")
+    job_list.clear()
+    index.job_list = job_list
+    yield index
+    index.connection and index.connection.close()
+
+
+def scan(index, file_dict):
+    """deliver the result of a folder scan"""
+    index.update()
+    job = index.job_list.pop()
+    job.file_dict = dict(file_dict)
+    index.on_folders_scanned(job)
+
+
+def extract(index, page_count, text_list):
+    """deliver the text of the next batch of the first pending document"""
+    job = index.job_list.pop()
+    job.page_count = page_count
+    job.text_list = text_list
+    index.on_text_extracted(job)
+    return job
+
+
+def test_index_and_search(index):
+    scan(index, {"/a.pdf": (10, 1.0), "/b.pdf": (20, 2.0)})
+    assert index.document_count == 2
+
+    assert extract(index, 2, ["Straße und Café", "second page"]).path == "/a.pdf"
+    assert extract(index, 1, ["Another café"]).path == "/b.pdf"
+    assert index.job_list == []
+
+    hit_list = index.search("cafe")
+    assert sorted((hit.path, hit.page_index) for hit in hit_list) == [
+        ("/a.pdf", 0),
+        ("/b.pdf", 0),
+    ]
+    assert index.search("SECO") == [LibraryHit("/a.pdf", 1, "second page")]
+    assert index.search("strasse") == []
+    assert index.search("STRASSE und") == []
+    assert [hit.page_index for hit in index.search("straße")] == [0]
+    assert index.search("") == []
+
+
+def test_documents_are_indexed_in_batches(index):
+    index.BATCH_SIZE = 2
+    scan(index, {"/a.pdf": (10, 1.0)})
+    job = extract(index, 3, ["one", "two"])
+    assert (job.start, job.end) == (0, 2)
+    job = index.job_list[-1]
+    assert (job.start, job.end) == (2, 4)
+    extract(index, 3, ["three"])
+    assert [hit.page_index for hit in index.search("three")] == [2]
+
+
+def test_changed_and_removed_documents(index):
+    scan(index, {"/a.pdf": (10, 1.0), "/b.pdf": (20, 2.0)})
+    extract(index, 1, ["old text"])
+    extract(index, 1, ["kept text"])
+
+    # unchanged documents keep their pages, changed ones are indexed again
+    scan(index, {"/a.pdf": (11, 3.0), "/b.pdf": (20, 2.0)})
+    assert index.search("old") == []
+    extract(index, 1, ["new text"])
+    assert [hit.path for hit in index.search("new")] == ["/a.pdf"]
+    assert [hit.path for hit in index.search("kept")] == ["/b.pdf"]
+
+    scan(index, {"/b.pdf": (20, 2.0)})
+    assert index.document_count == 1
+    assert index.search("new") == []
+
+
+def test_interrupted_documents_continue(index):
+    index.BATCH_SIZE = 1
+    scan(index, {"/a.pdf": (10, 1.0)})
+    extract(index, 2, ["first"])
+
+    scan(index, {"/a.pdf": (10, 1.0)})
+    job = index.job_list[-1]
+    assert (job.start, job.end) == (1, 2)
+
+
+def test_page_rowids(index):
+    scan(index, {"/a.pdf": (10, 1.0)})
+    extract(index, 1, ["text"])
+    (rowid,) = index.connection.execute("SELECT rowid FROM pages").fetchone()
+    (id,) = index.connection.execute("SELECT id FROM documents").fetchone()
+    assert rowid == id << PAGE_BITS
+
+
+def test_disabled_index(index, monkeypatch):
+    scan(index, {"/a.pdf": (10, 1.0)})
+    extract(index, 1, ["text"])
+    monkeypatch.setattr(cfg.libraryIndexEnabled, "value", False)
+    assert index.search("text") == []
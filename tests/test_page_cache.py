@@ -0,0 +1,65 @@
+# coding: utf-8
+from PyQt5.QtGui import QPixmap
+
+from app.common.page_cache import PageCache, PageCacheKey
+
+
+def create_key(page_index, tile=None):
+    return PageCacheKey("document", page_index, 1.0, 0, 1.0, tile)
+
+
+def create_pixmap(width, height):
+    pixmap = QPixmap(width, height)
+    pixmap.fill()
+    return pixmap
+
+
+def test_get_and_put(qapp):
+    page_cache = PageCache(1024 * 1024)
+    assert page_cache.get(create_key(0)) is None
+
+    pixmap = create_pixmap(10, 10)
+    page_cache.put(create_key(0), pixmap)
+    assert page_cache.get(create_key(0)) is pixmap
+    assert page_cache.get(create_key(0, (0, 0, 10, 10))) is None
+    assert page_cache.statistics()["hits"] == 1
+    assert page_cache.statistics()["misses"] == 2
+
+
+def test_least_recently_used_is_evicted(qapp):
+    size = PageCache.get_pixmap_size(create_pixmap(10, 10))
+    page_cache = PageCache(2 * size)
+    page_cache.put(create_key(0), create_pixmap(10, 10))
+    page_cache.put(create_key(1), create_pixmap(10, 10))
+    page_cache.get(create_key(0))
+    page_cache.put(create_key(2), create_pixmap(10, 10))
+
+    assert page_cache.get(create_key(1)) is None
+    assert page_cache.get(create_key(0)) is not None
+    assert page_cache.get(create_key(2)) is not None
+    assert page_cache.used_bytes == 2 * size
+    assert page_cache.evictions == 1
+
+
+def test_replacing_an_image_updates_used_bytes(qapp):
+    page_cache = PageCache(1024 * 1024)
+    page_cache.put(create_key(0), create_pixmap(10, 10))
+    page_cache.put(create_key(0), create_pixmap(20, 20))
+    assert page_cache.used_bytes == PageCache.get_pixmap_size(create_pixmap(20, 20))
+
+
+def test_images_over_budget_are_not_cached(qapp):
+    page_cache = PageCache(100)
+    page_cache.put(create_key(0), create_pixmap(10, 10))
+    assert page_cache.get(create_key(0)) is None
+    assert page_cache.used_bytes == 0
+
+
+def test_set_max_bytes_evicts(qapp):
+    size = PageCache.get_pixmap_size(create_pixmap(10, 10))
+    page_cache = PageCache(3 * size)
+    for i in range(3):
+        page_cache.put(create_key(i), create_pixmap(10, 10))
+
+    page_cache.set_max_bytes(size)
+    assert list(page_cache.pixmap_dict) == [create_key(2)]
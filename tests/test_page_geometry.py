@@ -0,0 +1,52 @@
+# coding: utf-8
+from PyQt5.QtCore import QRect, QSize
+
+from app.components.page_canvas import PageGeometry
+
+
+def create_geometry():
+    page_geometry = PageGeometry(margin=10, spacing=5)
+    page_geometry.add_pages([(100, 200), (300, 100)])
+    page_geometry.add_pages([(200, 50)])
+    return page_geometry
+
+
+def test_page_tops():
+    page_geometry = create_geometry()
+    assert len(page_geometry) == 3
+    assert [page_geometry.get_page_top(i) for i in range(4)] == [10, 215, 320, 375]
+    assert page_geometry.get_content_size() == QSize(320, 380)
+
+
+def test_page_rect_is_centered():
+    page_geometry = create_geometry()
+    assert page_geometry.get_page_rect(0) == QRect(110, 10, 100, 200)
+    assert page_geometry.get_page_rect(1) == QRect(10, 215, 300, 100)
+
+
+def test_zoom():
+    page_geometry = create_geometry()
+    page_geometry.set_transform(2.0, 0)
+    assert page_geometry.get_page_size(2) == QSize(400, 100)
+    assert page_geometry.get_page_top(2) == 10 + 600 + 2 * 5
+    assert page_geometry.get_content_size() == QSize(620, 10 + 700 + 10 + 10)
+
+
+def test_rotation_lays_pages_on_their_side():
+    page_geometry = create_geometry()
+    page_geometry.set_transform(1.0, 90)
+    assert page_geometry.is_rotated()
+    assert page_geometry.get_page_size(0) == QSize(100, 200)
+    assert page_geometry.get_page_rect(0) == QRect(10, 10, 200, 100)
+    assert page_geometry.get_page_top(1) == 10 + 100 + 5
+    assert page_geometry.get_content_size() == QSize(220, 10 + 600 + 10 + 10)
+
+
+def test_get_page_at():
+    page_geometry = create_geometry()
+    assert page_geometry.get_page_at(-50) == 0
+    assert page_geometry.get_page_at(0) == 0
+    assert page_geometry.get_page_at(214) == 0
+    assert page_geometry.get_page_at(215) == 1
+    assert page_geometry.get_page_at(330) == 2
+    assert page_geometry.get_page_at(10000) == 2
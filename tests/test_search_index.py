@@ -0,0 +1,132 @@
+# coding: utf-8
+import random
+import re
+
+import pytest
+
+from app.common.search_index import SearchHit, SearchIndex
+from app.utils.text_utils import get_regex_literals, get_terms, get_trigrams
+
+
+def create_index(text_list, batch_size=3):
+    """index pages batch by batch like the index jobs of a view area"""
+    search_index = SearchIndex()
+    for start in range(0, len(text_list), batch_size):
+        end = min(start + batch_size, len(text_list))
+        posting_dict = {}
+        trigram_dict = {}
+        for i in range(start, end):
+            for position, word in enumerate(text_list[i].split()):
+                for term in get_terms(word):
+                    posting_dict.setdefault(term, []).append((i, position))
+
+            for trigram in get_trigrams(text_list[i]):
+                trigram_dict[trigram] = trigram_dict.get(trigram, 0) | 1 << (i - start)
+
+        search_index.add_postings(posting_dict)
+        search_index.add_trigrams(trigram_dict, start, end)
+    return search_index
+
+
+TEXT_LIST = [
+    "Café, hello world",
+    "ERR-2498 was logged",
+    "nothing to see",
+    "hello there, world",
+    "The COLOR of money",
+    "Übung macht den Meister",
+    "error 24 again",
+]
+
+
+def test_search_prefix():
+    search_index = create_index(TEXT_LIST)
+    assert [hit.page_index for hit in search_index.search("hel")] == [0, 3]
+    assert search_index.search("zzz") == []
+    assert search_index.search("  ") == []
+
+
+def test_search_adjacent_terms():
+    search_index = create_index(TEXT_LIST)
+    assert search_index.search("café hello") == [SearchHit(0, 0, 1)]
+    assert search_index.search("err 24") == [SearchHit(1, 0, 0), SearchHit(6, 0, 1)]
+    # the terms have to follow each other
+    assert search_index.search("hello world") == [SearchHit(0, 1, 2)]
+
+
+def test_search_folds_case_and_accents():
+    search_index = create_index(TEXT_LIST)
+    assert search_index.search("UBUNG") == [SearchHit(5, 0, 0)]
+    assert search_index.search("cafe") == [SearchHit(0, 0, 0)]
+
+
+def test_search_finds_terms_added_after_a_search():
+    search_index = create_index(TEXT_LIST[:2])
+    assert search_index.search("there") == []
+
+    more_index = create_index(TEXT_LIST)
+    search_index.add_postings(
+        {
+            term: [item for item in posting_list if item[0] >= 2]
+            for term, posting_list in more_index.posting_dict.items()
+            if any(item[0] >= 2 for item in posting_list)
+        }
+    )
+    assert search_index.search("there") == [SearchHit(3, 1, 1)]
+    assert search_index.term_list == sorted(search_index.posting_dict)
+
+
+def test_get_candidate_pages_keeps_unindexed_pages():
+    search_index = create_index(TEXT_LIST[:3])
+    assert search_index.get_candidate_pages(["hello"], 5) == [0, 3, 4]
+    # literals shorter than a trigram filter nothing
+    assert search_index.get_candidate_pages(["he"], 3) == [0, 1, 2]
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "hello",
+        "colou?r",
+        "h.llo",
+        "(cafe|café)",
+        "err-\\d+",
+        "über|uber",
+        "WORLD$",
+        re.escape("err-2498"),
+    ],
+)
+def test_get_candidate_pages_keeps_matching_pages(pattern):
+    search_index = create_index(TEXT_LIST)
+    page_list = search_index.get_candidate_pages(
+        get_regex_literals(pattern), len(TEXT_LIST)
+    )
+    for i, text in enumerate(TEXT_LIST):
+        if re.search(pattern, text, re.IGNORECASE):
+            assert i in page_list
+
+
+def test_get_candidate_pages_never_drops_a_match():
+    """random patterns over random pages, some characters folding to others"""
+    rng = random.Random(0)
+    alphabet = "abcAB éeÉßsSẞKkKﬁf"
+    text_list = [
+        "".join(rng.choice(alphabet) for _ in range(rng.randrange(40)))
+        for _ in range(50)
+    ]
+    search_index = create_index(text_list, batch_size=7)
+    for _ in range(500):
+        pattern = "".join(
+            rng.choice([*alphabet, ".", "?", "|", "[ab]", "(a|b)", "(?:ab)?"])
+            for _ in range(rng.randrange(1, 8))
+        )
+        try:
+            regex = re.compile(pattern, re.IGNORECASE)
+            literal_list = get_regex_literals(pattern)
+        except re.error:
+            continue
+
+        page_list = search_index.get_candidate_pages(literal_list, len(text_list))
+        for i, text in enumerate(text_list):
+            if regex.search(text):
+                assert i in page_list, (pattern, text)
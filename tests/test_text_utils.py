@@ -0,0 +1,128 @@
+# coding: utf-8
+import re
+
+import pymupdf
+import pytest
+
+from app.utils.text_utils import (
+    fold_text,
+    get_page_html,
+    get_regex_literals,
+    get_terms,
+    get_trigrams,
+    get_words,
+    search_page_text,
+)
+
+
+@pytest.mark.parametrize(
+    "pattern, literal_list",
+    [
+        ("hello", ["hello"]),
+        ("hello world", ["hello world"]),
+        # anchors take no characters
+        (r"^hello\b", ["hello"]),
+        # repeated characters are optional or variable
+        ("colou?r", ["colo", "r"]),
+        ("ab+c", ["a", "c"]),
+        ("ab{2}c", ["a", "c"]),
+        # optional groups are left out, plain groups are kept
+        ("(foo)?bar", ["bar"]),
+        ("(?:foo)bar", ["foobar"]),
+        ("(foo)bar", ["foobar"]),
+        # no literal is required by every branch of an alternation
+        ("foo|bar", []),
+        ("x(?:foo|bar)y", ["x", "y"]),
+        # classes and wildcards break the literal run
+        ("ab[cd]ef", ["ab", "ef"]),
+        (r"ab\dcd", ["ab", "cd"]),
+        ("ab.cd", ["ab", "cd"]),
+        # escaped text searches are one literal
+        (re.escape("1.5 (beta)"), ["1.5 (beta)"]),
+    ],
+)
+def test_get_regex_literals(pattern, literal_list):
+    assert get_regex_literals(pattern) == literal_list
+
+
+def test_get_regex_literals_invalid_pattern():
+    with pytest.raises(re.error):
+        get_regex_literals("(foo")
+
+
+@pytest.mark.parametrize(
+    "pattern, text",
+    [
+        ("colou?r", "The COLOR of"),
+        ("(foo)?bar", "BAR"),
+        ("x(?:foo|bar)y", "xBARy"),
+        ("ab[cd]ef", "ABDEF"),
+        ("straße", "STRAẞE"),
+        ("übung", "ÜBUNG"),
+        ("kelvin", "KELVIN"),
+    ],
+)
+def test_get_regex_literals_match_folded_text(pattern, text):
+    """the trigrams of the literals are trigrams of any text the pattern matches"""
+    assert re.search(pattern, text, re.IGNORECASE)
+    for literal in get_regex_literals(pattern):
+        assert get_trigrams(literal) <= get_trigrams(text)
+
+
+def test_fold_text():
+    assert fold_text("Übung") == fold_text("ubung") == "ubung"
+    assert fold_text("Straße") == "strasse"
+    assert fold_text("ﬁle") == "file"
+
+
+def test_get_terms():
+    assert get_terms("ERR-2498, Café!") == ["err", "2498", "cafe"]
+
+
+def test_get_trigrams():
+    assert get_trigrams("ab") == set()
+    assert get_trigrams("Abcd") == {"abc", "bcd"}
+
+
+def test_get_words():
+    assert get_words(" ERR-2498,\xa0Café\n\nhello\u2003world ") == [
+        "ERR-2498,",
+        "Café",
+        "hello\u2003world",
+    ]
+
+
+def test_search_page_text():
+    text_list = ["Café cafe", "none", "CAFÉ"]
+    hit_list = search_page_text([3, 4, 5], text_list, "caf.", 10, context_chars=2)
+    assert hit_list == [
+        (3, "Café", 0, "Café c"),
+        (3, "cafe", 0, "é cafe"),
+        (5, "CAFÉ", 0, "CAFÉ"),
+    ]
+    assert len(search_page_text([3, 4, 5], text_list, "caf.", 2)) == 2
+
+
+def test_get_page_html_keeps_images_in_place():
+    document = pymupdf.open()
+    page = document.new_page()
+    for i, (y, size) in enumerate([(80, 100), (240, 500)]):
+        pixmap = pymupdf.Pixmap(pymupdf.csRGB, pymupdf.IRect(0, 0, 20, 20), False)
+        pixmap.clear_with(i * 100)
+        page.insert_text((50, y - 20), f"Text {i}")
+        page.insert_image(pymupdf.Rect(50, y, 50 + size, y + size), pixmap=pixmap)
+    page.insert_text((50, 780), "Text 2")
+    document = pymupdf.open("pdf", document.tobytes())
+    page = document[0]
+    xref_list = [item[0] for item in page.get_images()]
+
+    html = get_page_html(page, True)
+
+    assert (
+        html.index("Text 0")
+        < html.index(f'page-image:{xref_list[0]}" width="100" height="100"')
+        < html.index("Text 1")
+        < html.index(f'page-image:{xref_list[1]}" width="300" height="300"')
+        < html.index("Text 2")
+    )
+    assert "<img" not in get_page_html(page, False)